@@ -20,10 +20,19 @@ export default function Dashboard() {
 
   const fetchTasks = async () => {
     try {
-      const res = await api.get("/tasks/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setTasks(res.data);
+      const allTasks = [];
+      let after = null;
+
+      do {
+        const res = await api.get("/tasks/", {
+          headers: { Authorization: `Bearer ${token}` },
+          params: after ? { after } : {},
+        });
+        allTasks.push(...res.data);
+        after = res.headers["x-next-cursor"];
+      } while (after);
+
+      setTasks(allTasks);
     } catch (err) {
       console.error("Failed to load tasks", err);
     }
@@ -33,6 +42,72 @@ export default function Dashboard() {
     fetchTasks();
   }, []);
 
+  // Apply changes pushed by the server instead of polling the task list.
+  // EventSource cannot send the Authorization header, so read the stream
+  // with fetch.
+  useEffect(() => {
+    const controller = new AbortController();
+
+    const applyEvent = (type, data) => {
+      if (type === "created") {
+        setTasks((prev) => {
+          const known = new Set(prev.map((t) => t.id));
+          return [...prev, ...data.tasks.filter((t) => !known.has(t.id))];
+        });
+      } else if (type === "completed") {
+        const ids = new Set(data.ids);
+        setTasks((prev) =>
+          prev.map((t) => (ids.has(t.id) ? { ...t, complete: true } : t))
+        );
+      } else if (type === "deleted") {
+        const ids = new Set(data.ids);
+        setTasks((prev) => prev.filter((t) => !ids.has(t.id)));
+      } else if (type === "reset") {
+        fetchTasks();
+      }
+    };
+
+    const listen = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const res = await fetch(`${api.defaults.baseURL}/tasks/events`, {
+            headers: { Authorization: `Bearer ${token}` },
+            signal: controller.signal,
+          });
+          const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+          let buffer = "";
+
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value;
+
+            const messages = buffer.split("\n\n");
+            buffer = messages.pop();
+            for (const message of messages) {
+              const fields = Object.fromEntries(
+                message
+                  .split("\n")
+                  .filter((line) => line && !line.startsWith(":"))
+                  .map((line) => [line.slice(0, line.indexOf(":")), line.slice(line.indexOf(":") + 2)])
+              );
+              if (fields.event) applyEvent(fields.event, JSON.parse(fields.data));
+            }
+          }
+        } catch (err) {
+          if (controller.signal.aborted) return;
+          console.error("Task event stream failed", err);
+        }
+        // Changes may have been missed while disconnected
+        await new Promise((resolve) => setTimeout(resolve, 3000));
+        if (!controller.signal.aborted) fetchTasks();
+      }
+    };
+
+    listen();
+    return () => controller.abort();
+  }, [token]);
+
   const handleAddTask = async (e) => {
     e.preventDefault();
     setError("");
@@ -1,26 +1,73 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+import time
 import uuid
+from . import hashing
 from .models import Users
 from .dependencies import get_db
+from .replicas import replicas
+from .cache import TTLCache
+from .metrics import Counter
 from .config import settings   
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = hashing.PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+PASSWORD_HASH_REJECTIONS = Counter(
+    "app_password_hash_rejections_total",
+    "Password hash/verify calls rejected because the hashing pool was saturated."
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+# token -> user id, so repeat requests skip JWT decoding
+token_cache = TTLCache(
+    "auth_tokens",
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+# user id -> Principal, so repeat requests skip the users query
+principal_cache = TTLCache(
+    "auth_principals",
+    max_size=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    email: str
+    is_active: bool
+
+
+async def _run_hasher(function, *args):
+    try:
+        return await password_hasher.run(function, *args)
+    except hashing.HasherBusy:
+        PASSWORD_HASH_REJECTIONS.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await _run_hasher(hashing.hash_password, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hasher(hashing.verify_password, plain_password, hashed_password)
 
 
 # def create_access_token(
@@ -55,32 +102,97 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
+def invalidate_user(user_id: int):
+    """Drop a cached principal, e.g. after deactivating the user with a bulk UPDATE."""
+    principal_cache.pop(user_id)
+
+
+@event.listens_for(Users, "after_update")
+@event.listens_for(Users, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+_READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
 
-        user_id: int | None = payload.get("id")
-        if user_id is None:
-            raise credentials_exception
+async def get_token_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    user_id = token_cache.get(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=[settings.ALGORITHM]
+            )
 
-    except JWTError:
-        raise credentials_exception
+            user_id = payload.get("id")
+            if user_id is None:
+                raise _credentials_exception()
 
-    user = db.query(Users).filter(Users.id == user_id).first()
-    if user is None:
-        raise credentials_exception
+        except JWTError:
+            raise _credentials_exception()
+
+        # Never serve a token from the cache past its own expiry
+        ttl = settings.AUTH_CACHE_TTL_SECONDS
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        token_cache.set(token, user_id, ttl=ttl)
+
+    return user_id
+
+
+async def get_read_db(
+    request: Request,
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_db)
+):
+    """get_db for authenticated requests: GET and HEAD requests read from a
+    replica when one is usable, everything else shares the primary session."""
+    replica_db = None
+    if request.method in _READ_METHODS:
+        replica_db = await replicas.session(user_id)
+
+    if replica_db is None:
+        replicas.track_writes(db, user_id)
+        yield db
+        return
+
+    try:
+        yield replica_db
+    finally:
+        await replica_db.close()
+
+
+async def get_current_user(
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db)
+):
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        query = select(Users).where(Users.id == user_id)
+        user = (await db.execute(query)).scalars().first()
+        if user is None and db is not primary_db:
+            # A replica may not have caught up with the registration yet
+            user = (await primary_db.execute(query)).scalars().first()
+        if user is None or not user.is_active:
+            raise _credentials_exception()
+
+        principal = Principal(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active
+        )
+        principal_cache.set(user_id, principal)
 
-    return user
+    return principal
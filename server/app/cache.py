@@ -0,0 +1,258 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import redis.asyncio as redis
+
+from .config import settings
+from .metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "app_cache_requests_total",
+    "Cache lookups by cache and result (hit, miss or error).",
+    ["cache", "result"]
+)
+CACHE_ENTRIES = Gauge(
+    "app_cache_entries",
+    "Number of entries currently held by each cache.",
+    ["cache"]
+)
+CACHE_BYTES = Gauge(
+    "app_cache_bytes",
+    "Bytes of values currently held by each in-process byte-bounded cache.",
+    ["cache"]
+)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire ``ttl`` seconds after insertion.
+
+    Holds at most ``max_size`` entries, evicting the least recently used one
+    when full. Hits and misses are counted in ``app_cache_requests_total``
+    under the cache's ``name``.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = CACHE_REQUESTS.labels(cache=name, result="hit")
+        self._misses = CACHE_REQUESTS.labels(cache=name, result="miss")
+        CACHE_ENTRIES.labels(cache=name).set_function(self.__len__)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                del self._entries[key]
+        self._misses.inc()
+        return default
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheUnavailable(Exception):
+    pass
+
+
+class MemoryBackend:
+    """Bounded in-process LRU of bytes values, for a single worker.
+
+    Evicts least recently used entries once the values held exceed
+    ``max_bytes``.
+    """
+
+    def __init__(self, name: str, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        CACHE_ENTRIES.labels(cache=name).set_function(self.__len__)
+        CACHE_BYTES.labels(cache=name).set_function(lambda: self._size)
+
+    def _get(self, key, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove(self, key):
+        self._size -= len(self._entries.pop(key)[1])
+
+    def _set(self, key, value: bytes, ttl: float):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        now = time.monotonic()
+        with self._lock:
+            return [self._get(key, now) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            if self._get(key, time.monotonic()) is not None:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Any server speaking the Redis protocol, shared by every worker.
+
+    Memory is bounded by the server's maxmemory setting.
+    """
+
+    def __init__(self, url: str | None = None, client=None):
+        self.client = client if client is not None else redis.from_url(url)
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        try:
+            return await self.client.mget(keys)
+        except (redis.RedisError, OSError) as exc:
+            raise CacheUnavailable(exc) from exc
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        try:
+            await self.client.set(key, value, px=int(ttl * 1000))
+        except (redis.RedisError, OSError) as exc:
+            raise CacheUnavailable(exc) from exc
+
+    async def add(self, key: str, value: bytes, ttl: float) -> bool:
+        try:
+            return bool(await self.client.set(key, value, px=int(ttl * 1000), nx=True))
+        except (redis.RedisError, OSError) as exc:
+            raise CacheUnavailable(exc) from exc
+
+
+class GenerationalCache:
+    """Values grouped per owner and invalidated together in one write.
+
+    Each owner has a random generation token. Values are stored tagged with
+    the token that was current before their data was read, and served only
+    while it still is; ``invalidate`` replaces the token. A read that raced
+    with a write therefore can never be served after it. Without a backend
+    every lookup misses and nothing is stored.
+    """
+
+    def __init__(self, name: str, backend, ttl: float, max_value_bytes: int):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.max_value_bytes = max_value_bytes
+        self._hits = CACHE_REQUESTS.labels(cache=name, result="hit")
+        self._misses = CACHE_REQUESTS.labels(cache=name, result="miss")
+        self._errors = CACHE_REQUESTS.labels(cache=name, result="error")
+
+    def _generation_key(self, owner) -> str:
+        return f"{self.name}:{owner}:generation"
+
+    def _value_key(self, owner, key: str) -> str:
+        return f"{self.name}:{owner}:{key}"
+
+    async def get(self, owner, key: str) -> tuple[bytes | None, bytes | None]:
+        """Return (generation, value); pass the generation on to ``set``."""
+        if self.backend is None:
+            return None, None
+
+        try:
+            generation, value = await self.backend.get_many(
+                [self._generation_key(owner), self._value_key(owner, key)]
+            )
+            if generation is None:
+                generation = uuid.uuid4().hex.encode()
+                if not await self.backend.add(self._generation_key(owner), generation, self.ttl):
+                    # Another request started the generation first
+                    generation = None
+        except CacheUnavailable as exc:
+            logger.warning("Cache %s unavailable: %s", self.name, exc)
+            self._errors.inc()
+            return None, None
+
+        if generation is not None and value is not None and value.startswith(generation + b":"):
+            self._hits.inc()
+            return generation, value[len(generation) + 1:]
+        self._misses.inc()
+        return generation, None
+
+    async def set(self, owner, key: str, generation: bytes | None, value: bytes):
+        if generation is None or len(value) > self.max_value_bytes:
+            return
+        try:
+            await self.backend.set(
+                self._value_key(owner, key), generation + b":" + value, self.ttl
+            )
+        except CacheUnavailable as exc:
+            logger.warning("Cache %s unavailable: %s", self.name, exc)
+
+    async def invalidate(self, owner):
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(
+                self._generation_key(owner), uuid.uuid4().hex.encode(), self.ttl
+            )
+        except CacheUnavailable as exc:
+            # Entries stay servable until they expire
+            logger.error("Cache %s could not be invalidated for %s: %s", self.name, owner, exc)
+
+
+def create_task_list_cache() -> GenerationalCache:
+    backend = None
+    if settings.TASK_CACHE == "memory":
+        backend = MemoryBackend("task_list", settings.TASK_CACHE_MAX_BYTES)
+    elif settings.TASK_CACHE == "redis":
+        backend = RedisBackend(settings.TASK_CACHE_URL)
+    return GenerationalCache(
+        "task_list",
+        backend,
+        ttl=settings.TASK_CACHE_TTL_SECONDS,
+        max_value_bytes=settings.TASK_CACHE_MAX_ENTRY_BYTES
+    )
@@ -1,3 +1,7 @@
+import os
+from typing import Literal
+
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -9,6 +13,77 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     SQLALCHEMY_DATABASE_URL: str
 
+    # Connection pool, per engine and per worker process. Workers times
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay below the server's limit.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+
+    # Read replicas for GET endpoints, as comma-separated database URLs.
+    # Each is checked every DB_REPLICA_CHECK_INTERVAL seconds and skipped
+    # while unreachable or more than DB_REPLICA_MAX_LAG_SECONDS behind;
+    # reads use the primary when no replica is usable. For
+    # READ_YOUR_WRITES_SECONDS after a user's own write, their reads go to
+    # the primary. That window is tracked per worker, for at most
+    # READ_YOUR_WRITES_MAX_USERS users at once, so with several workers a
+    # read reaching another worker may briefly miss the write.
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_CHECK_INTERVAL: float = 5
+    DB_REPLICA_MAX_LAG_SECONDS: float = 10
+    READ_YOUR_WRITES_SECONDS: float = 5
+    READ_YOUR_WRITES_MAX_USERS: int = 10000
+
+    # Decoded tokens and resolved users are cached per worker. A user
+    # deactivated through another worker keeps access for at most the TTL.
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+
+    # bcrypt runs in a process pool of this many workers (0 runs it in a
+    # thread). The pool is per uvicorn worker, so with --workers N set it to
+    # about the core count divided by N. Once MAX_PENDING calls are queued,
+    # /register and /login answer 503.
+    PASSWORD_HASH_WORKERS: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Largest number of tasks accepted by one POST /tasks/bulk
+    BULK_MAX_ITEMS: int = 10000
+
+    # POST /tasks/import validates and commits this many rows at a time,
+    # and reports at most IMPORT_MAX_ERRORS failed rows in its response.
+    # Longer lines and CSV records are rejected as row errors unread
+    IMPORT_CHUNK_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 1000
+    IMPORT_MAX_RECORD_LENGTH: int = 1024 * 1024
+
+    # GET /tasks/events fan-out: "memory" reaches streams in the same
+    # process only; "postgres" uses LISTEN/NOTIFY to reach every worker.
+    # A stream more than EVENT_QUEUE_SIZE events behind is told to refetch.
+    EVENT_BROKER: Literal["memory", "postgres"] = "memory"
+    EVENT_QUEUE_SIZE: int = 100
+    EVENT_KEEPALIVE_SECONDS: float = 15
+
+    # GET /tasks/ response cache, invalidated by every task write: "memory"
+    # holds up to TASK_CACHE_MAX_BYTES per worker and suits one worker only;
+    # "redis" is shared by all workers (size it with the server's maxmemory).
+    # Pages larger than TASK_CACHE_MAX_ENTRY_BYTES are never cached.
+    TASK_CACHE: Literal["none", "memory", "redis"] = "none"
+    TASK_CACHE_URL: str = "redis://localhost:6379/0"
+    TASK_CACHE_TTL_SECONDS: int = 300
+    TASK_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    TASK_CACHE_MAX_ENTRY_BYTES: int = 1024 * 1024
+
+    # SQL statements are timed per request. Statements slower than
+    # SQL_SLOW_QUERY_MS are logged, as are requests running one statement
+    # SQL_REPEATED_QUERY_THRESHOLD or more times (a probable N+1).
+    # SQL_PROFILE_HEADER adds the request's query count and DB time to
+    # every response; turn it on only while debugging.
+    SQL_PROFILING: bool = True
+    SQL_SLOW_QUERY_MS: float = 100
+    SQL_REPEATED_QUERY_THRESHOLD: int = 5
+    SQL_PROFILE_HEADER: bool = False
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
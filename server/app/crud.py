@@ -0,0 +1,218 @@
+from typing import Any, Callable, Literal
+
+from sqlalchemy import (
+    BigInteger, Row, Select, Update, exists, func, insert, literal, select, tuple_, update
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Executable
+
+from .models import TaskTombstones, Tasks, Users
+
+TaskSort = Literal["id", "-id", "priority", "-priority"]
+
+# Exactly the fields of TaskResponse, for reads that skip the ORM
+TASK_COLUMNS = (Tasks.id, Tasks.title, Tasks.description, Tasks.priority, Tasks.complete)
+
+
+def task_sort_key(sort: TaskSort) -> tuple:
+    if sort in ("id", "-id"):
+        return (Tasks.id,)
+    return (Tasks.priority, Tasks.id)
+
+
+def task_filters(
+    user_id: int,
+    complete: bool | None = None,
+    priority_min: int | None = None,
+    priority_max: int | None = None,
+    ids: list[int] | None = None
+) -> list:
+    """WHERE clauses selecting a user's tasks, shared by reads and bulk writes."""
+    conditions = [Tasks.user_id == user_id]
+
+    if ids is not None:
+        conditions.append(Tasks.id.in_(ids))
+    if complete is not None:
+        conditions.append(Tasks.complete == complete)
+    if priority_min is not None:
+        conditions.append(Tasks.priority >= priority_min)
+    if priority_max is not None:
+        conditions.append(Tasks.priority <= priority_max)
+
+    return conditions
+
+
+def task_list_query(
+    user_id: int,
+    complete: bool | None = None,
+    priority_min: int | None = None,
+    priority_max: int | None = None,
+    sort: TaskSort = "id",
+    after: list | None = None,
+    limit: int | None = None,
+    columns: tuple | None = None
+) -> Select:
+    query = select(*columns) if columns else select(Tasks)
+    query = query.where(
+        *task_filters(user_id, complete, priority_min, priority_max)
+    )
+
+    # Every sort order is a tuple of columns walked in a single direction,
+    # so the cursor condition is a row comparison the index can seek to.
+    key = task_sort_key(sort)
+    descending = sort.startswith("-")
+
+    if after is not None:
+        if descending:
+            query = query.where(tuple_(*key) < tuple_(*after))
+        else:
+            query = query.where(tuple_(*key) > tuple_(*after))
+
+    if descending:
+        query = query.order_by(*(column.desc() for column in key))
+    else:
+        query = query.order_by(*key)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+def task_cursor_values(task: Tasks, sort: TaskSort) -> list:
+    return [getattr(task, column.key) for column in task_sort_key(sort)]
+
+
+async def get_task_version(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(
+        select(Users.task_version).where(Users.id == user_id)
+    )
+    # A replica that has not replicated the user yet has none of their
+    # tasks either, which is the state before their first write
+    return result.scalar_one_or_none() or 0
+
+
+def _task_version_bump(user_id: int, only_if: tuple) -> Update:
+    bump = update(Users).where(Users.id == user_id)
+    if only_if:
+        bump = bump.where(exists().where(Tasks.user_id == user_id, *only_if))
+    return bump.values(task_version=Users.task_version + 1).returning(Users.task_version)
+
+
+async def bump_task_version(db: AsyncSession, user_id: int, *only_if) -> int | None:
+    """Record a change to the user's tasks in the current transaction.
+
+    With ``only_if`` conditions, only if one of their tasks meets them;
+    returns None otherwise.
+    """
+    result = await db.execute(
+        _task_version_bump(user_id, only_if)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
+
+
+async def insert_tasks(db: AsyncSession, user_id: int, rows: list[dict]) -> list[Tasks]:
+    """Insert the user's new tasks, stamped with their next task_version,
+    and return them in the order given."""
+    if db.bind.dialect.name != "postgresql":
+        version = await bump_task_version(db, user_id)
+        result = await db.execute(
+            insert(Tasks).returning(Tasks, sort_by_parameter_order=True),
+            [{**row, "user_id": user_id, "version": version} for row in rows]
+        )
+        return result.scalars().all()
+
+    # One statement, bump included, however many rows: each column is
+    # sent as one array and unnested
+    bump = _task_version_bump(user_id, ()).cte("task_version")
+    columns = ["title", "description", "priority"]
+    new_tasks = select(*(
+        func.unnest(
+            literal([row[column] for row in rows], ARRAY(Tasks.__table__.c[column].type))
+        ).label(column)
+        for column in columns
+    )).subquery()
+    result = await db.execute(
+        insert(Tasks)
+        .from_select(
+            [*columns, "complete", "user_id", "version"],
+            select(
+                *(new_tasks.c[column] for column in columns),
+                literal(False),
+                literal(user_id),
+                bump.c.task_version
+            )
+        )
+        .returning(Tasks)
+        .add_cte(bump)
+    )
+    # Ids are drawn from the sequence in row order
+    return sorted(result.scalars().all(), key=lambda task: task.id)
+
+
+async def write_tasks_versioned(
+    db: AsyncSession,
+    user_id: int,
+    write: Callable[[Any], Executable],
+    *only_if
+) -> list[Row]:
+    """Execute ``write(version)``, an UPDATE or DELETE of the user's tasks
+    built with ``version`` as their next task_version, and return its rows.
+
+    On PostgreSQL the version is bumped by the same statement, through a
+    CTE; elsewhere by a statement of its own first. With ``only_if``
+    conditions, nothing is bumped unless one of the user's tasks meets
+    them, so writes that match nothing change nothing.
+    """
+    if db.bind.dialect.name != "postgresql":
+        version = await bump_task_version(db, user_id, *only_if)
+        if version is None:
+            return []
+        version = literal(version, BigInteger)
+        return (await db.execute(write(version))).all()
+
+    bump = _task_version_bump(user_id, only_if).cte("task_version")
+    version = select(bump.c.task_version).scalar_subquery()
+    return (await db.execute(write(version).add_cte(bump))).all()
+
+
+async def get_task_changes(
+    db: AsyncSession,
+    user_id: int,
+    since: int | None,
+    until: int,
+    after: list | None = None,
+    limit: int | None = None
+) -> list[tuple[int, int, Tasks | None]]:
+    """(version, task id, task or None if deleted) for the user's tasks
+    written after ``since`` and up to ``until``, ordered by (version, id).
+
+    Without ``since`` every current task is returned and no deletions.
+    """
+    tasks = select(Tasks).where(Tasks.user_id == user_id, Tasks.version <= until)
+    tombstones = select(TaskTombstones.version, TaskTombstones.task_id).where(
+        TaskTombstones.user_id == user_id,
+        TaskTombstones.version <= until
+    )
+    if since is not None:
+        tasks = tasks.where(Tasks.version > since)
+        tombstones = tombstones.where(TaskTombstones.version > since)
+    if after is not None:
+        tasks = tasks.where(tuple_(Tasks.version, Tasks.id) > tuple_(*after))
+        tombstones = tombstones.where(
+            tuple_(TaskTombstones.version, TaskTombstones.task_id) > tuple_(*after)
+        )
+
+    # Two index range reads merged here, each no longer than the page
+    tasks = tasks.order_by(Tasks.version, Tasks.id).limit(limit)
+    tombstones = tombstones.order_by(TaskTombstones.version, TaskTombstones.task_id).limit(limit)
+
+    changes = [(task.version, task.id, task) for task in (await db.execute(tasks)).scalars()]
+    if since is not None:
+        changes += [(version, task_id, None) for version, task_id in await db.execute(tombstones)]
+    changes.sort(key=lambda change: change[:2])
+
+    return changes[:limit]
+
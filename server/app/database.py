@@ -1,7 +1,195 @@
-from sqlalchemy import create_engine
+import contextlib
+import heapq
+import logging
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URL)
+from .metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "app_db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    ["engine"],
+    buckets=(
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+        0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+    )
+)
+POOL_TIMEOUTS = Counter(
+    "app_db_pool_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT seconds.",
+    ["engine"]
+)
+POOL_CONNECTIONS = Gauge(
+    "app_db_pool_connections",
+    "Pooled connections by state (checked_out, idle, overflow) and the configured size.",
+    ["engine", "state"]
+)
+
+
+def async_url(url: str | URL) -> URL:
+    """Swap a database URL's driver for the asyncio driver of its backend."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+class _InstrumentedPool:
+    metrics_label = ""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.labels(engine=self.metrics_label).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(engine=self.metrics_label).observe(
+                time.perf_counter() - start
+            )
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def pool_options(url: str | URL, is_async: bool = False) -> dict:
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    # SQLite keeps its own single-connection pools
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+POOL_STATES = {
+    "checked_out": lambda pool: pool.checkedout(),
+    "idle": lambda pool: pool.checkedin(),
+    # QueuePool counts overflow from -pool_size
+    "overflow": lambda pool: max(pool.overflow(), 0),
+    "size": lambda pool: pool.size(),
+}
+
+
+def observe_pool(engine, label: str):
+    """Export an engine's pool occupancy, read at scrape time."""
+    def reader(state):
+        def read():
+            # engine.pool is replaced when the engine is disposed
+            pool = engine.pool
+            return POOL_STATES[state](pool) if isinstance(pool, QueuePool) else 0
+        return read
+
+    for state in POOL_STATES:
+        POOL_CONNECTIONS.labels(engine=label, state=state).set_function(reader(state))
+
+
+class QueryProfile:
+    """SQL statements executed on behalf of one request."""
+
+    SLOWEST = 3
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # statement text -> executions, to spot the same query in a loop
+        self.executions = {}
+        # (duration, statement) of the SLOWEST slowest statements
+        self.slowest = []
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.executions[statement] = self.executions.get(statement, 0) + 1
+        if len(self.slowest) < self.SLOWEST:
+            heapq.heappush(self.slowest, (duration, statement))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, statement))
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least ``threshold`` times, most first."""
+        return sorted(
+            ((statement, count) for statement, count in self.executions.items()
+             if count >= threshold),
+            key=lambda item: -item[1]
+        )
+
+
+query_profile: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+
+
+@contextlib.contextmanager
+def profile_queries():
+    """Record every statement executed in this context, on any engine."""
+    profile = QueryProfile()
+    token = query_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        query_profile.reset(token)
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    profile = query_profile.get()
+    if profile is not None:
+        profile.record(statement, duration)
+    if duration * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", duration * 1000, statement)
+
+
+def _drop_query_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start"):
+        connection.info["query_start"].pop()
+
+
+if settings.SQL_PROFILING:
+    # Registered on the Engine class so every engine is timed, including
+    # the sync side of async engines
+    event.listen(Engine, "before_cursor_execute", _start_query_timer)
+    event.listen(Engine, "after_cursor_execute", _stop_query_timer)
+    event.listen(Engine, "handle_error", _drop_query_timer)
+
+
+# Synchronous engine for schema management and scripts
+engine = create_engine(
+    settings.SQLALCHEMY_DATABASE_URL,
+    **pool_options(settings.SQLALCHEMY_DATABASE_URL)
+)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -9,4 +197,20 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Request handlers use the async engine
+async_engine = create_async_engine(
+    async_url(settings.SQLALCHEMY_DATABASE_URL),
+    **pool_options(settings.SQLALCHEMY_DATABASE_URL, is_async=True)
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+observe_pool(engine, "sync")
+observe_pool(async_engine.sync_engine, "async")
+
 Base = declarative_base()
@@ -0,0 +1,18 @@
+import hashlib
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(
+        "\0".join(str(part) for part in parts).encode()
+    ).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag.removeprefix("W/") for tag in candidates)
@@ -0,0 +1,222 @@
+import abc
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+from collections import defaultdict
+
+import asyncpg
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "task_events"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+# Tells a stream it may have missed events and should refetch
+RESET = {"type": "reset"}
+
+EVENT_SUBSCRIBERS = Gauge(
+    "app_task_event_subscribers",
+    "Task event streams currently open in this worker."
+)
+
+_PENDING = "pending_task_events"
+
+_CONNECTION_ERRORS = (
+    OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError
+)
+
+
+class Subscription:
+    """Queue of events for one stream, bound to the loop that serves it.
+
+    A stream that falls ``max_size`` events behind has its backlog replaced
+    by a single reset event.
+    """
+
+    def __init__(self, max_size: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_size)
+
+    def _put(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+    def put(self, event: dict):
+        # Publishers may run on another thread's loop
+        with contextlib.suppress(RuntimeError):
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    async def get(self, timeout: float) -> dict:
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker(abc.ABC):
+    """Fans events out to the streams open in this process."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @contextlib.contextmanager
+    def subscribe(self, user_id: int):
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        EVENT_SUBSCRIBERS.inc()
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(subscription)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+            EVENT_SUBSCRIBERS.dec()
+
+    def deliver(self, user_id: int, event: dict):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def deliver_all(self, event: dict):
+        with self._lock:
+            subscriptions = [s for group in self._subscribers.values() for s in group]
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    @abc.abstractmethod
+    async def publish(self, db: AsyncSession, user_id: int, event: dict):
+        """Queue an event to be delivered once ``db`` commits."""
+
+
+class MemoryBroker(Broker):
+    """Delivers events to this process only, for single-worker deployments."""
+
+    async def publish(self, db: AsyncSession, user_id: int, event: dict):
+        db.info.setdefault(_PENDING, []).append((self, user_id, event))
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_pending(session):
+    for broker, user_id, task_event in session.info.pop(_PENDING, ()):
+        broker.deliver(user_id, task_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+class PostgresBroker(Broker):
+    """Delivers events to every worker through PostgreSQL LISTEN/NOTIFY.
+
+    NOTIFY is sent in the writer's transaction, so PostgreSQL only delivers
+    events whose changes committed. Each worker holds one listening
+    connection and reconnects when it drops; streams are sent a reset
+    then, since events may have been missed meanwhile.
+    """
+
+    def __init__(self, url: str, queue_size: int, reconnect_delay: float = 1.0):
+        super().__init__(queue_size)
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self.reconnect_delay = reconnect_delay
+        self.listening = asyncio.Event()
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def publish(self, db: AsyncSession, user_id: int, event: dict):
+        payload = json.dumps({"user_id": user_id, "event": event}, separators=(",", ":"))
+        await db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+    def _notified(self, connection, pid, channel, payload):
+        message = json.loads(payload)
+        self.deliver(message["user_id"], message["event"])
+
+    async def _listen(self):
+        reconnecting = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except _CONNECTION_ERRORS as exc:
+                logger.warning("Task event listener could not connect: %s", exc)
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            try:
+                await connection.add_listener(CHANNEL, self._notified)
+                self.listening.set()
+                if reconnecting:
+                    self.deliver_all(RESET)
+                await lost.wait()
+                logger.warning("Task event listener lost its connection")
+            except _CONNECTION_ERRORS as exc:
+                logger.warning("Task event listener failed: %s", exc)
+            finally:
+                self.listening.clear()
+                if not connection.is_closed():
+                    await connection.close()
+            reconnecting = True
+            await asyncio.sleep(self.reconnect_delay)
+
+
+def create_broker() -> Broker:
+    if settings.EVENT_BROKER == "postgres":
+        return PostgresBroker(settings.SQLALCHEMY_DATABASE_URL, settings.EVENT_QUEUE_SIZE)
+    return MemoryBroker(settings.EVENT_QUEUE_SIZE)
+
+
+broker = create_broker()
+
+
+async def publish_task_event(db: AsyncSession, user_id: int, type: str, version: int, **data):
+    """Publish a change to the user's tasks as part of the current transaction."""
+    task_event = {"type": type, "version": version, **data}
+    if len(json.dumps(task_event, separators=(",", ":"))) > MAX_PAYLOAD_BYTES:
+        # Too large for one notification; streams refetch instead
+        task_event = {**RESET, "version": version}
+    await broker.publish(db, user_id, task_event)
+
+
+def format_event(task_event: dict) -> str:
+    """Encode an event as a Server-Sent Events message."""
+    lines = []
+    if "version" in task_event:
+        lines.append(f"id: {task_event['version']}")
+    lines.append(f"event: {task_event['type']}")
+    lines.append(f"data: {json.dumps(task_event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
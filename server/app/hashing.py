@@ -0,0 +1,79 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _ready() -> None:
+    """Submitted once per worker to spawn it ahead of the first real call."""
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt in a dedicated process pool.
+
+    At most ``max_pending`` calls may be queued or running at once; further
+    calls raise ``HasherBusy`` immediately instead of waiting. With
+    ``workers=0`` calls run in a thread instead.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.workers and self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Spawned workers only import this module, not the app
+                    executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                    # The pool spawns a worker per submission while none
+                    # is idle, so this starts all of them now
+                    for _ in range(self.workers):
+                        executor.submit(_ready)
+                    self._executor = executor
+        return self._executor
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def run(self, function, *args):
+        if self._slots is None or not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            if not self.workers:
+                return await asyncio.to_thread(function, *args)
+            try:
+                return await asyncio.wrap_future(self.start().submit(function, *args))
+            except BrokenProcessPool:
+                # A worker died; replace the pool for subsequent calls,
+                # without blocking the event loop to join the old one
+                self.shutdown(wait=False)
+                raise HasherBusy()
+        finally:
+            self._slots.release()
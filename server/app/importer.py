@@ -0,0 +1,179 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Tasks
+
+IMPORT_COLUMNS = ("title", "description", "priority", "complete", "user_id", "version")
+
+
+class RowError(Exception):
+    pass
+
+
+class LineTooLong(RowError):
+    def __init__(self, max_length: int):
+        super().__init__(f"Line longer than {max_length} characters")
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_length: int
+) -> AsyncIterator[list[str | RowError]]:
+    """Split a byte stream into batches of text lines, one batch per chunk.
+
+    A line longer than ``max_length`` characters is not kept; a
+    ``LineTooLong`` error takes its place in the batch.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    too_long = False
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        if too_long and lines:
+            # The first line ends the one that was cut short
+            lines[0] = LineTooLong(max_length)
+            too_long = False
+        lines = [
+            LineTooLong(max_length) if isinstance(line, str) and len(line) > max_length else line
+            for line in lines
+        ]
+        if len(pending) > max_length:
+            pending = ""
+            too_long = True
+        if lines:
+            yield lines
+    pending += decoder.decode(b"", final=True)
+    if too_long or len(pending) > max_length:
+        yield [LineTooLong(max_length)]
+    elif pending:
+        yield [pending]
+
+
+async def iter_ndjson(
+    batches: AsyncIterator[list[str | RowError]]
+) -> AsyncIterator[list[tuple[int, dict | RowError]]]:
+    row = 0
+    async for lines in batches:
+        items = []
+        for line in lines:
+            row += 1
+            if isinstance(line, RowError):
+                items.append((row, line))
+                continue
+            if not line.strip():
+                continue
+            try:
+                items.append((row, json.loads(line)))
+            except json.JSONDecodeError as exc:
+                items.append((row, RowError(f"Invalid JSON: {exc.msg}")))
+        yield items
+
+
+def _ends_quoted(line: str, quoted: bool) -> bool:
+    """Whether a quoted field is still open at the end of ``line``.
+
+    Follows the csv module: a quote opens a field only at its start, and
+    is literal anywhere else in an unquoted field.
+    """
+    at_field_start = not quoted
+    after_quote = False
+    for char in line:
+        if quoted:
+            if char == '"':
+                quoted = False
+                after_quote = True
+        elif after_quote and char == '"':
+            # A doubled quote inside a quoted field
+            quoted = True
+            after_quote = False
+        elif char == ",":
+            at_field_start = True
+            after_quote = False
+        elif at_field_start and char == '"':
+            quoted = True
+            at_field_start = False
+        else:
+            at_field_start = False
+            after_quote = False
+    return quoted
+
+
+async def iter_csv(
+    batches: AsyncIterator[list[str | RowError]], max_length: int
+) -> AsyncIterator[list[tuple[int, dict | RowError]]]:
+    """Parse CSV records, which may span lines inside quoted fields.
+
+    A record longer than ``max_length`` characters is reported as an error
+    once it ends; its text is not kept meanwhile.
+    """
+    header = None
+    row = 0
+    record = ""
+    quoted = False
+    error = None
+    async for lines in batches:
+        items = []
+        for line in lines:
+            if isinstance(line, RowError):
+                # Whether it closed a quoted field is unknown; assume not
+                error, quoted = error or line, False
+            else:
+                quoted = _ends_quoted(line, quoted)
+                if error is None:
+                    record = f"{record}\n{line}" if record else line
+                    if len(record) > max_length:
+                        error, record = RowError(f"Record longer than {max_length} characters"), ""
+                if quoted:
+                    continue
+            text, record = record, ""
+            if error is not None:
+                row += 1
+                items.append((row, error))
+                error = None
+                continue
+            if not text.strip():
+                continue
+
+            values = next(csv.reader([text.rstrip("\r")]))
+            if header is None:
+                header = values
+                continue
+
+            row += 1
+            if len(values) != len(header):
+                items.append((row, RowError(
+                    f"Expected {len(header)} columns, got {len(values)}"
+                )))
+                continue
+            # Empty cells are missing values, as the CSV export writes them
+            items.append((row, {
+                key: value for key, value in zip(header, values) if value != ""
+            }))
+        yield items
+
+    if quoted:
+        yield [(row + 1, error or RowError("Unterminated quoted field"))]
+
+
+async def write_tasks(db: AsyncSession, rows: list[dict]):
+    """Insert rows in the current transaction, with COPY on PostgreSQL.
+
+    asyncpg only opens the transaction on the first statement, so one must
+    have been executed already for COPY to be part of it.
+    """
+    connection = await db.connection()
+
+    if connection.dialect.name == "postgresql":
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Tasks.__tablename__,
+            records=[tuple(row[column] for column in IMPORT_COLUMNS) for row in rows],
+            columns=IMPORT_COLUMNS
+        )
+    else:
+        await db.execute(insert(Tasks), rows)
@@ -1,13 +1,28 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import auth, tasks
-from app.database import Base, engine
-from app import models  
+from app.routers import auth, metrics, tasks
+from app.auth import password_hasher
+from app.events import broker
+from app.middleware import MetricsMiddleware, QueryProfileMiddleware
+from app.replicas import replicas
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spawn the bcrypt workers before the first login instead of during it
+    password_hasher.start()
+    await broker.start()
+    await replicas.start()
+    yield
+    await replicas.stop()
+    await broker.stop()
+    password_hasher.shutdown()
 
-app = FastAPI()
 
-Base.metadata.create_all(bind=engine)
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -16,7 +31,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-DB-Queries", "Server-Timing"],
 )
+app.add_middleware(QueryProfileMiddleware)
+# Added last so it is outermost and times CORS handling as well
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def root():
@@ -24,3 +43,4 @@ def root():
 
 app.include_router(auth.router)
 app.include_router(tasks.router)
+app.include_router(metrics.router)
@@ -0,0 +1,125 @@
+import logging
+import time
+
+from .config import settings
+from .database import profile_queries
+from .metrics import Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = Histogram(
+    "app_http_request_duration_seconds",
+    "Time from receiving a request to sending the end of its response, by "
+    "method, route template and status.",
+    ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "app_http_requests_in_flight",
+    "Requests currently being handled by this worker, by method.",
+    ["method"]
+)
+
+# Anything else is reported as "OTHER" so clients cannot mint label values
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+def _route_label(scope) -> str:
+    # The router records the matched route in the shared scope
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """Records per-route latency and in-flight requests for every HTTP request.
+
+    Requests are labelled with the matched route's path template, never the
+    raw path, so label cardinality stays bounded by the number of routes;
+    requests that match no route share the "unmatched" label. A plain ASGI
+    middleware rather than BaseHTTPMiddleware, so it adds no task or
+    stream wrapping to the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._durations = {}
+        self._in_flight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in METHODS else "OTHER"
+        in_flight = self._in_flight.get(method)
+        if in_flight is None:
+            in_flight = self._in_flight[method] = REQUESTS_IN_FLIGHT.labels(method=method)
+
+        # An exception before the response starts ends up as a 500
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            in_flight.dec()
+            key = (method, _route_label(scope), status)
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = REQUEST_DURATION.labels(
+                    method=key[0], route=key[1], status=key[2]
+                )
+            histogram.observe(duration)
+
+
+class QueryProfileMiddleware:
+    """Profiles the SQL each HTTP request executes.
+
+    Requests that run the same statement SQL_REPEATED_QUERY_THRESHOLD or
+    more times are logged as probable N+1s, with their slowest statements.
+    With SQL_PROFILE_HEADER, responses carry the statement count in
+    X-DB-Queries and the time spent in the database in Server-Timing, as
+    of when the response started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries() as profile:
+            async def send_with_profile(message):
+                if message["type"] == "http.response.start" and settings.SQL_PROFILE_HEADER:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-queries", str(profile.count).encode()),
+                        (b"server-timing", f"db;dur={profile.duration * 1000:.2f}".encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_profile)
+            finally:
+                repeated = profile.repeated(settings.SQL_REPEATED_QUERY_THRESHOLD)
+                if repeated:
+                    statement, count = repeated[0]
+                    logger.warning(
+                        "Probable N+1 in %s %s: %d statements in %.1f ms, %r run %d times; "
+                        "slowest: %s",
+                        scope["method"], _route_label(scope), profile.count,
+                        profile.duration * 1000, statement, count,
+                        "; ".join(
+                            f"{duration * 1000:.1f} ms {text!r}"
+                            for duration, text in sorted(profile.slowest, reverse=True)
+                        )
+                    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, DDL, event
 from app.database import Base
 from sqlalchemy import BigInteger
 
@@ -14,6 +14,8 @@ class Users(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     phone_number = Column(BigInteger, nullable=False)
+    # Bumped by every change to the user's tasks; the task list ETag
+    task_version = Column(BigInteger, nullable=False, default=0, server_default="0")
 
 
 class Tasks(Base):
@@ -25,3 +27,168 @@ class Tasks(Base):
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey("users.id"))
+    # The owner's task_version as of the last write to this task
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    # One index per filter/sort shape of get_my_tasks, each ending in the
+    # keyset columns so every page is a single index range read
+    __table_args__ = (
+        Index("ix_tasks_user_id_id", "user_id", "id"),
+        Index("ix_tasks_user_id_priority_id", "user_id", "priority", "id"),
+        Index("ix_tasks_user_id_complete_id", "user_id", "complete", "id"),
+        Index(
+            "ix_tasks_user_id_complete_priority_id",
+            "user_id", "complete", "priority", "id"
+        ),
+        Index("ix_tasks_user_id_version_id", "user_id", "version", "id"),
+    )
+
+
+class TaskTombstones(Base):
+    """Deleted tasks, so GET /tasks/changes can report deletions."""
+    __tablename__ = "task_tombstones"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(BigInteger, primary_key=True)
+    task_id = Column(Integer, primary_key=True)
+
+
+
+class TaskStats(Base):
+    """Running task counts per user and priority, kept in step with every
+    task write so the dashboard totals are a primary key range read."""
+    __tablename__ = "task_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    total = Column(BigInteger, nullable=False, default=0)
+    completed = Column(BigInteger, nullable=False, default=0)
+
+
+# task_stats and task_tombstones follow every write to tasks through
+# triggers, however the rows are written (ORM, bulk statements, COPY). A
+# deleted task's tombstone takes its owner's task_version, which the
+# deleting transaction has already bumped.
+def _count_tasks(changes: str) -> str:
+    """Upsert the sums of ``changes``, (user_id, priority, total,
+    completed) deltas, into task_stats."""
+    # Ordered so concurrent writers lock the rows in the same order
+    return f"""INSERT INTO task_stats (user_id, priority, total, completed)
+        SELECT user_id, priority, sum(total), sum(completed)
+        FROM ({changes}) AS changes
+        WHERE user_id IS NOT NULL AND priority IS NOT NULL
+        GROUP BY user_id, priority
+        HAVING sum(total) <> 0 OR sum(completed) <> 0
+        ORDER BY user_id, priority
+        ON CONFLICT (user_id, priority) DO UPDATE SET
+            total = task_stats.total + excluded.total,
+            completed = task_stats.completed + excluded.completed"""
+
+
+def _task_deltas(rows: str, sign: int) -> str:
+    return f"""SELECT {rows}.user_id AS user_id, {rows}.priority AS priority, {sign} AS total,
+        CASE WHEN {rows}.complete THEN {sign} ELSE 0 END AS completed"""
+
+
+# PostgreSQL handles all of a statement's rows at once, through transition
+# tables
+TASK_TRIGGER_FUNCTIONS = ["tasks_count_insert", "tasks_count_update", "tasks_count_delete"]
+
+for statement in [
+    f"""CREATE OR REPLACE FUNCTION tasks_count_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {_count_tasks(_task_deltas("new_tasks", 1) + " FROM new_tasks")};
+        RETURN NULL;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION tasks_count_update() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {_count_tasks(
+            _task_deltas("new_tasks", 1) + " FROM new_tasks UNION ALL "
+            + _task_deltas("old_tasks", -1) + " FROM old_tasks"
+        )};
+        RETURN NULL;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION tasks_count_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {_count_tasks(_task_deltas("old_tasks", -1) + " FROM old_tasks")};
+        INSERT INTO task_tombstones (user_id, version, task_id)
+        SELECT old_tasks.user_id, users.task_version, old_tasks.id
+        FROM old_tasks JOIN users ON users.id = old_tasks.user_id;
+        RETURN NULL;
+    END $$""",
+    """CREATE TRIGGER tasks_count_insert AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_insert()""",
+    """CREATE TRIGGER tasks_count_update AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_tasks NEW TABLE AS new_tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_update()""",
+    """CREATE TRIGGER tasks_count_delete AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_delete()""",
+]:
+    event.listen(Tasks.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+event.listen(
+    Tasks.__table__,
+    "after_drop",
+    DDL(
+        "DROP FUNCTION IF EXISTS " + ", ".join(f"{name}()" for name in TASK_TRIGGER_FUNCTIONS)
+    ).execute_if(dialect="postgresql")
+)
+
+# SQLite has only row triggers
+for statement in [
+    f"""CREATE TRIGGER tasks_count_insert AFTER INSERT ON tasks BEGIN
+        {_count_tasks(_task_deltas("new", 1))};
+    END""",
+    f"""CREATE TRIGGER tasks_count_update AFTER UPDATE OF user_id, priority, complete ON tasks BEGIN
+        {_count_tasks(_task_deltas("new", 1) + " UNION ALL " + _task_deltas("old", -1))};
+    END""",
+    f"""CREATE TRIGGER tasks_count_delete AFTER DELETE ON tasks BEGIN
+        {_count_tasks(_task_deltas("old", -1))};
+        INSERT INTO task_tombstones (user_id, version, task_id)
+        SELECT old.user_id, task_version, old.id FROM users WHERE id = old.user_id;
+    END""",
+]:
+    event.listen(Tasks.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+# Full-text search over title and description, kept outside the mapped
+# columns because each backend stores it differently. PostgreSQL gets a
+# generated tsvector with a GIN index; the planner ANDs its bitmap with
+# ix_tasks_user_id_id to scope matches to the current user.
+SEARCH_CONFIG = "english"
+
+for statement in [
+    f"""ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('{SEARCH_CONFIG}', coalesce(title, '') || ' ' || coalesce(description, ''))
+    ) STORED""",
+    "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+]:
+    event.listen(Tasks.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+# SQLite mirrors the columns into an external-content FTS5 table kept in
+# sync by triggers
+for statement in [
+    """CREATE VIRTUAL TABLE tasks_fts USING fts5(
+        title, description, content='tasks', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]:
+    event.listen(Tasks.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+event.listen(
+    Tasks.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite")
+)
@@ -0,0 +1,51 @@
+import base64
+import binascii
+import json
+import math
+
+from fastapi import HTTPException
+from sqlalchemy import BigInteger, Float, Integer
+
+from .schemas import MAX_INTEGER, MIN_INTEGER
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _fits(value, column_type) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(column_type, BigInteger):
+        return isinstance(value, int) and -2**63 <= value < 2**63
+    if isinstance(column_type, Integer):
+        return isinstance(value, int) and MIN_INTEGER <= value <= MAX_INTEGER
+    if isinstance(column_type, Float):
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    raise TypeError(f"No cursor check for {column_type!r}")
+
+
+def decode_cursor(cursor: str, column_types: list) -> list:
+    """Values of a cursor made by ``encode_cursor``, one per key column.
+
+    Each must fit its column's type, so a tampered cursor is a 400 rather
+    than an error from the database driver.
+    """
+    invalid_cursor = HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        raise invalid_cursor
+
+    if not isinstance(values, list) or len(values) != len(column_types):
+        raise invalid_cursor
+    if not all(_fits(value, column_type) for value, column_type in zip(values, column_types)):
+        raise invalid_cursor
+
+    return values
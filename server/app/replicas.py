@@ -0,0 +1,223 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+from .config import settings
+from .database import async_url, pool_options
+from .metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+READ_ROUTES = Counter(
+    "app_db_read_routes_total",
+    "Sessions handed to read-only requests, by target (replica or primary) "
+    "and reason (replica, no_replica, recent_write or unavailable).",
+    ["target", "reason"]
+)
+REPLICA_HEALTHY = Gauge(
+    "app_db_replica_healthy",
+    "1 while a read replica passes its health check, 0 otherwise.",
+    ["replica"]
+)
+
+_CONNECTION_ERRORS = (DBAPIError, OSError, asyncio.TimeoutError, PoolTimeoutError)
+
+# Seconds a streaming replica is behind the primary. Zero once it has
+# replayed everything it received, so an idle primary does not look like lag.
+POSTGRES_LAG = text("""SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+END""")
+
+# Session.info keys
+_REPLICA = "replica"
+_WRITER = "writer"
+_WROTE = "wrote"
+
+
+class Replica:
+    """One read replica and whether it last passed its health check."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.sessionmaker = async_sessionmaker(
+            engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        self.healthy = True
+        self._healthy_gauge = REPLICA_HEALTHY.labels(replica=self.name)
+        self._healthy_gauge.set(1)
+
+    def set_healthy(self, healthy: bool):
+        if healthy != self.healthy:
+            logger.warning(
+                "Read replica %s is %s", self.name, "healthy again" if healthy else "unhealthy"
+            )
+        self.healthy = healthy
+        self._healthy_gauge.set(1 if healthy else 0)
+
+
+class ReplicaRouter:
+    """Spreads read-only sessions over healthy replicas, round-robin.
+
+    Replicas are checked every ``check_interval`` seconds once started, and
+    taken out of rotation while unreachable or more than ``max_lag``
+    seconds behind; one that fails to connect during a request is taken
+    out at once and the request falls back to the primary. Users who wrote
+    in the last ``read_your_writes`` seconds read from the primary, so they
+    always see their own changes; up to ``read_your_writes_max_users`` of
+    them are remembered at a time.
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        check_interval: float,
+        max_lag: float,
+        read_your_writes: float,
+        read_your_writes_max_users: int = 10000
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._next = itertools.count()
+        self._task = None
+        self._recent_writers = (
+            TTLCache("read_your_writes", max_size=read_your_writes_max_users, ttl=read_your_writes)
+            if read_your_writes > 0 else None
+        )
+
+    async def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._check_forever())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def mark_write(self, user_id: int):
+        if self._recent_writers is not None:
+            self._recent_writers.set(user_id, True)
+
+    def track_writes(self, db: AsyncSession, user_id: int):
+        """Start ``user_id``'s read-your-writes window whenever ``db`` commits a write."""
+        db.info[_WRITER] = (self, user_id)
+
+    def wrote_recently(self, user_id: int) -> bool:
+        return self._recent_writers is not None and self._recent_writers.get(user_id, False)
+
+    def candidates(self) -> list[Replica]:
+        """Healthy replicas, starting from the next one in turn."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return []
+        start = next(self._next) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    async def session(self, user_id: int) -> AsyncSession | None:
+        """A connected replica session for a read by ``user_id``, or None
+        if the read should go to the primary."""
+        if not self.replicas:
+            READ_ROUTES.labels(target="primary", reason="no_replica").inc()
+            return None
+        if self.wrote_recently(user_id):
+            READ_ROUTES.labels(target="primary", reason="recent_write").inc()
+            return None
+
+        for replica in self.candidates():
+            db = replica.sessionmaker()
+            db.info[_REPLICA] = replica.name
+            try:
+                # Connect now, while falling back is still possible
+                await db.connection()
+            except _CONNECTION_ERRORS as exc:
+                await db.close()
+                logger.warning("Read replica %s failed: %s", replica.name, exc)
+                replica.set_healthy(False)
+                continue
+            READ_ROUTES.labels(target="replica", reason="replica").inc()
+            return db
+
+        READ_ROUTES.labels(target="primary", reason="unavailable").inc()
+        return None
+
+    async def check(self, replica: Replica):
+        try:
+            async with asyncio.timeout(self.check_interval):
+                async with replica.engine.connect() as conn:
+                    if conn.dialect.name == "postgresql":
+                        lag = float(await conn.scalar(POSTGRES_LAG))
+                    else:
+                        await conn.execute(text("SELECT 1"))
+                        lag = 0.0
+        except _CONNECTION_ERRORS as exc:
+            logger.debug("Read replica %s health check failed: %s", replica.name, exc)
+            replica.set_healthy(False)
+            return
+        replica.set_healthy(lag <= self.max_lag)
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def _check_forever(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+
+def is_replica(db: AsyncSession) -> bool:
+    return _REPLICA in db.info
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_statement_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush_write(session, flush_context):
+    session.info[_WROTE] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_writer(session):
+    writer = session.info.get(_WRITER)
+    if session.info.pop(_WROTE, False) and writer is not None:
+        router, user_id = writer
+        router.mark_write(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session):
+    session.info.pop(_WROTE, None)
+
+
+def create_replica_router() -> ReplicaRouter:
+    urls = [url.strip() for url in settings.DB_REPLICA_URLS.split(",") if url.strip()]
+    return ReplicaRouter(
+        [
+            create_async_engine(async_url(url), **pool_options(url, is_async=True))
+            for url in urls
+        ],
+        check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+        max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+        read_your_writes=settings.READ_YOUR_WRITES_SECONDS,
+        read_your_writes_max_users=settings.READ_YOUR_WRITES_MAX_USERS
+    )
+
+
+replicas = create_replica_router()
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, select
 from datetime import timedelta
 
 from ..models import Users
 from ..schemas import Token, UserCreate, UserResponse
 from ..dependencies import get_db
+from ..replicas import replicas
 from ..auth import (
     verify_password,
     create_access_token,
@@ -17,13 +18,16 @@ from ..config import settings
 router = APIRouter(tags=["Auth"])
 
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(Users).filter(
-        or_(
-            Users.username == user.username,
-            Users.email == user.email
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(Users).where(
+            or_(
+                Users.username == user.username,
+                Users.email == user.email
+            )
         )
-    ).first()
+    )
+    existing_user = result.scalars().first()
 
     if existing_user:
         raise HTTPException(
@@ -36,28 +40,31 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         username=user.username,
         first_name=user.first_name,
         last_name=user.last_name,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password(user.password),
         phone_number=user.phone_number,
         is_active=True
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    # The new user's first requests must not read from a lagging replica
+    replicas.mark_write(new_user.id)
 
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(Users).filter(
-        Users.username == form_data.username
-    ).first()
+    result = await db.execute(
+        select(Users).where(Users.username == form_data.username)
+    )
+    user = result.scalars().first()
 
-    if not user or not verify_password(
+    if not user or not await verify_password(
         form_data.password, user.hashed_password
     ):
         raise HTTPException(
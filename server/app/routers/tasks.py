@@ -1,75 +1,585 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import csv
+import io
+import json
+import logging
+import zlib
+from typing import Any, Literal
 
-from ..models import Tasks
-from ..schemas import TaskCreate, TaskResponse
+import orjson
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Float, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import TaskStats, Tasks
+from ..schemas import (
+    MAX_INTEGER,
+    MIN_INTEGER,
+    TaskBulkError,
+    TaskBulkResponse,
+    TaskBulkResult,
+    TaskChanges,
+    TaskCreate,
+    TaskImportError,
+    TaskImportResult,
+    TaskResponse,
+    TaskSelection,
+    TaskStatsResponse
+)
 from ..dependencies import get_db
-from ..auth import get_current_user
+from ..auth import get_current_user, get_read_db
+from ..cache import create_task_list_cache
+from ..config import settings
+from ..crud import (
+    TASK_COLUMNS,
+    TaskSort,
+    bump_task_version,
+    get_task_changes,
+    get_task_version,
+    insert_tasks,
+    task_cursor_values,
+    task_filters,
+    task_list_query,
+    task_sort_key,
+    write_tasks_versioned
+)
+from ..etags import etag_matches, make_etag
+from ..events import broker, format_event, publish_task_event
+from ..importer import RowError, iter_csv, iter_lines, iter_ndjson, write_tasks
+from ..responses import rows_response
+from ..replicas import is_replica
+from ..search import task_search_query
+from ..metrics import Counter
+from ..pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor
+)
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+logger = logging.getLogger(__name__)
+
+# Whole GET /tasks/ responses per user and query string
+task_list_cache = create_task_list_cache()
+
+IMPORTED_ROWS = Counter(
+    "app_task_import_rows_total",
+    "Rows processed by POST /tasks/import, by result (imported or failed).",
+    ["result"]
+)
+
+
+def _task_payload(tasks) -> list[dict]:
+    return [TaskResponse.model_validate(task).model_dump() for task in tasks]
+
 
 @router.post("/", response_model=TaskResponse)
-def create_task(
+async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    new_task = Tasks(
-        title=task.title,
-        description=task.description,
-        priority=task.priority,
-        user_id=user.id
+    new_task, = await insert_tasks(db, user.id, [task.model_dump()])
+    await publish_task_event(
+        db, user.id, "created", new_task.version, tasks=_task_payload([new_task])
     )
-    db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    await db.commit()
+    await task_list_cache.invalidate(user.id)
     return new_task
 
 
+@router.post("/bulk", response_model=TaskBulkResponse)
+async def create_tasks_bulk(
+    items: list[Any] = Body(...),
+    partial: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BULK_MAX_ITEMS} tasks per request"
+        )
+
+    # Validate item by item so one bad task can be reported, not fatal
+    rows = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            task = TaskCreate.model_validate(item)
+        except ValidationError as exc:
+            errors.append(TaskBulkError(
+                index=index,
+                errors=exc.errors(
+                    include_url=False, include_context=False, include_input=False
+                )
+            ))
+            continue
+        rows.append(task.model_dump())
+
+    if errors and not partial:
+        raise HTTPException(
+            status_code=422,
+            detail=[error.model_dump() for error in errors]
+        )
+
+    created = []
+    if rows:
+        created = await insert_tasks(db, user.id, rows)
+        await publish_task_event(
+            db, user.id, "created", created[0].version, tasks=_task_payload(created)
+        )
+        await db.commit()
+        await task_list_cache.invalidate(user.id)
+
+    return {"created": created, "errors": errors}
+
+
+def _selection_filters(selection: TaskSelection, user_id: int) -> list:
+    if selection.ids is not None and len(selection.ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BULK_MAX_ITEMS} ids per request"
+        )
+
+    return task_filters(
+        user_id,
+        complete=selection.complete,
+        priority_min=selection.priority_min,
+        priority_max=selection.priority_max,
+        ids=selection.ids
+    )
+
+
+@router.post("/bulk/complete", response_model=TaskBulkResult)
+async def complete_tasks_bulk(
+    selection: TaskSelection,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    # Tasks that are already complete are left untouched and not counted
+    filters = [*_selection_filters(selection, user.id), Tasks.complete == False]
+    completed = await write_tasks_versioned(
+        db,
+        user.id,
+        lambda version: update(Tasks)
+        .where(*filters)
+        .values(complete=True, version=version)
+        .returning(Tasks.id, Tasks.version)
+        .execution_options(synchronize_session=False),
+        *filters
+    )
+    if not completed:
+        return {"affected": 0}
+
+    await publish_task_event(
+        db, user.id, "completed", completed[0].version, ids=[task_id for task_id, _ in completed]
+    )
+    await db.commit()
+    await task_list_cache.invalidate(user.id)
+
+    return {"affected": len(completed)}
+
+
+@router.post("/bulk/delete", response_model=TaskBulkResult)
+async def delete_tasks_bulk(
+    selection: TaskSelection,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    filters = _selection_filters(selection, user.id)
+    deleted = await write_tasks_versioned(
+        db,
+        user.id,
+        lambda version: delete(Tasks)
+        .where(*filters)
+        .returning(Tasks.id, version)
+        .execution_options(synchronize_session=False),
+        *filters
+    )
+    if not deleted:
+        return {"affected": 0}
+
+    await publish_task_event(
+        db, user.id, "deleted", deleted[0][1], ids=[task_id for task_id, _ in deleted]
+    )
+    await db.commit()
+    await task_list_cache.invalidate(user.id)
+
+    return {"affected": len(deleted)}
+
+
 @router.get("/", response_model=list[TaskResponse])
-def get_my_tasks(
-    db: Session = Depends(get_db),
+async def get_my_tasks(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    complete: bool | None = None,
+    priority_min: int | None = Query(None, ge=MIN_INTEGER, le=MAX_INTEGER),
+    priority_max: int | None = Query(None, ge=MIN_INTEGER, le=MAX_INTEGER),
+    sort: TaskSort = "id",
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_read_db),
     user=Depends(get_current_user)
 ):
-    return db.query(Tasks).filter(Tasks.user_id == user.id).all()
+    # Served without touching the database while no write has
+    # invalidated the user's cached pages
+    generation, cached = await task_list_cache.get(user.id, request.url.query)
+    if cached is not None:
+        headers, body = cached.split(b"\n", 1)
+        headers = orjson.loads(headers)
+        if etag_matches(if_none_match, headers["ETag"]):
+            headers.pop("X-Next-Cursor", None)
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    # The version changes with every write to the user's tasks, so an
+    # unchanged version means an unchanged page for the same query
+    version = await get_task_version(db, user.id)
+    etag = make_etag(user.id, version, request.url.query)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    cursor = None
+    if after is not None:
+        cursor = decode_cursor(after, [column.type for column in task_sort_key(sort)])
+
+    # Fetch one extra row to learn whether another page exists
+    query = task_list_query(
+        user.id,
+        complete=complete,
+        priority_min=priority_min,
+        priority_max=priority_max,
+        sort=sort,
+        after=cursor,
+        limit=limit + 1,
+        columns=TASK_COLUMNS
+    )
+    tasks = (await db.execute(query)).all()
+
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(
+            task_cursor_values(tasks[-1], sort)
+        )
+
+    # Plain rows straight to JSON: no ORM identity map, no per-task
+    # TaskResponse validation
+    response = rows_response(tasks, headers)
+    # A lagging replica may not have the write that started this
+    # generation, so only pages read from the primary are cached
+    if not is_replica(db):
+        await task_list_cache.set(
+            user.id, request.url.query, generation, orjson.dumps(headers) + b"\n" + response.body
+        )
+    return response
+
+
+@router.get("/changes", response_model=TaskChanges)
+async def get_task_changes_since(
+    response: Response,
+    since: int | None = Query(None, ge=0, le=2**63 - 1),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user)
+):
+    # Writes to a user's tasks are serialised on their version row, so
+    # every write at or below the version read here has committed and
+    # later writes are left for the next sync
+    version = await get_task_version(db, user.id)
+    cursor = None
+    if after is not None:
+        cursor = decode_cursor(after, [Tasks.version.type, Tasks.id.type])
+
+    changes = await get_task_changes(
+        db, user.id, since, version, after=cursor, limit=limit + 1
+    )
+    if len(changes) > limit:
+        changes = changes[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(list(changes[-1][:2]))
+
+    return {
+        "version": version,
+        "tasks": [task for _, _, task in changes if task is not None],
+        "deleted": [task_id for _, task_id, task in changes if task is None]
+    }
+
+
+@router.get("/stats", response_model=TaskStatsResponse)
+async def get_task_stats(
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user)
+):
+    # Reads the maintained counters, never the tasks themselves
+    result = await db.execute(
+        select(TaskStats.priority, TaskStats.total, TaskStats.completed)
+        .where(TaskStats.user_id == user.id, TaskStats.total > 0)
+        .order_by(TaskStats.priority)
+    )
+    by_priority = [
+        {"priority": priority, "total": total, "completed": completed, "open": total - completed}
+        for priority, total, completed in result.all()
+    ]
+    total = sum(row["total"] for row in by_priority)
+    completed = sum(row["completed"] for row in by_priority)
+
+    return {
+        "total": total,
+        "completed": completed,
+        "open": total - completed,
+        "by_priority": by_priority
+    }
+
+
+@router.get("/events")
+async def task_events(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user)
+):
+    # The stream may stay open for hours; give back any connection the
+    # user lookup checked out instead of holding it until then
+    await db.close()
+
+    async def body():
+        with broker.subscribe(user.id) as subscription:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    task_event = await subscription.get(settings.EVENT_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(task_event)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type="text/event-stream", headers=headers)
+
+
+@router.get("/search", response_model=list[TaskResponse])
+async def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user)
+):
+    cursor = None
+    if after is not None:
+        # Ranks are floating point on both backends
+        cursor = decode_cursor(after, [Float(), Tasks.id.type])
+
+    query = task_search_query(
+        db.bind.dialect.name,
+        user.id,
+        q,
+        after=cursor,
+        limit=limit + 1
+    )
+    rows = (await db.execute(query)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        task, rank = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([rank, task.id])
+
+    return [task for task, rank in rows]
+
+
+EXPORT_COLUMNS = ("id", "title", "description", "priority", "complete")
+EXPORT_BATCH_SIZE = 1000
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+@router.get("/export")
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    user=Depends(get_current_user)
+):
+    # Rows come from a server-side cursor one batch at a time, so memory
+    # use does not grow with the number of tasks
+    result = await db.stream(
+        select(*(getattr(Tasks, column) for column in EXPORT_COLUMNS))
+        .where(Tasks.user_id == user.id)
+        .order_by(Tasks.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    encode = _encode_csv if format == "csv" else _encode_ndjson
+
+    async def body():
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if gzip else None
+
+        def encode_chunk(text: str) -> bytes:
+            data = text.encode()
+            return compressor.compress(data) if compressor else data
+
+        if format == "csv":
+            yield encode_chunk(_encode_csv([EXPORT_COLUMNS]))
+        async for rows in result.partitions():
+            yield encode_chunk(encode(rows))
+        if compressor:
+            yield compressor.flush()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+    request: Request,
+    format: Literal["ndjson", "csv"] | None = None,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if content_type.startswith("text/csv") else "ndjson"
+
+    lines = iter_lines(request.stream(), settings.IMPORT_MAX_RECORD_LENGTH)
+    if format == "csv":
+        rows = iter_csv(lines, settings.IMPORT_MAX_RECORD_LENGTH)
+    else:
+        rows = iter_ndjson(lines)
+    imported = 0
+    failed = 0
+    errors = []
+    chunk = []
+
+    async def flush():
+        nonlocal imported
+        # Each chunk commits on its own, so a long import holds the user's
+        # version row only briefly and completed chunks survive a failure.
+        # COPY cannot carry the bump, so it is a statement of its own
+        version = await bump_task_version(db, user.id)
+        for row in chunk:
+            row["version"] = version
+        await write_tasks(db, chunk)
+        # COPY returns no ids, so streams refetch rather than receive the rows
+        await publish_task_event(db, user.id, "reset", version)
+        await db.commit()
+        await task_list_cache.invalidate(user.id)
+        imported += len(chunk)
+        IMPORTED_ROWS.labels(result="imported").inc(len(chunk))
+        logger.info("Task import for user %s: %s rows imported", user.id, imported)
+        chunk.clear()
+
+    # The body is parsed as it arrives; only one chunk of rows is held
+    async for items in rows:
+        for row, item in items:
+            if isinstance(item, RowError):
+                row_errors = [{"type": "parse_error", "loc": [], "msg": str(item)}]
+            else:
+                try:
+                    task = TaskCreate.model_validate(item)
+                except ValidationError as exc:
+                    row_errors = exc.errors(
+                        include_url=False, include_context=False, include_input=False
+                    )
+                else:
+                    chunk.append({**task.model_dump(), "complete": False, "user_id": user.id})
+                    if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+                        await flush()
+                    continue
+
+            failed += 1
+            IMPORTED_ROWS.labels(result="failed").inc()
+            if len(errors) < settings.IMPORT_MAX_ERRORS:
+                errors.append(TaskImportError(row=row, errors=row_errors))
+
+    if chunk:
+        await flush()
+
+    return {"imported": imported, "failed": failed, "errors": errors}
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
-def mark_complete(
-    task_id: int,
-    db: Session = Depends(get_db),
+async def mark_complete(
+    task_id: int = Path(..., ge=MIN_INTEGER, le=MAX_INTEGER),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    task = db.query(Tasks).filter(
-        Tasks.id == task_id,
-        Tasks.user_id == user.id
-    ).first()
+    # Ownership is part of the WHERE clause, so another user's task is
+    # indistinguishable from a missing one
+    filters = [Tasks.id == task_id, Tasks.user_id == user.id, Tasks.complete == False]
+    updated = await write_tasks_versioned(
+        db,
+        user.id,
+        lambda version: update(Tasks)
+        .where(*filters)
+        .values(complete=True, version=version)
+        .returning(Tasks)
+        .execution_options(synchronize_session=False),
+        *filters
+    )
 
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    if not updated:
+        # Nothing changed: the task is either missing or already complete
+        result = await db.execute(
+            select(Tasks).where(Tasks.id == task_id, Tasks.user_id == user.id)
+        )
+        task = result.scalar_one_or_none()
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return task
 
-    task.complete = True
-    db.commit()
-    db.refresh(task)
+    task, = updated[0]
+    await publish_task_event(db, user.id, "completed", task.version, ids=[task.id])
+    await db.commit()
+    await task_list_cache.invalidate(user.id)
     return task
 
 
 @router.delete("/{task_id}")
-def delete_task(
-    task_id: int,
-    db: Session = Depends(get_db),
+async def delete_task(
+    task_id: int = Path(..., ge=MIN_INTEGER, le=MAX_INTEGER),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    task = db.query(Tasks).filter(
-        Tasks.id == task_id,
-        Tasks.user_id == user.id
-    ).first()
+    filters = [Tasks.id == task_id, Tasks.user_id == user.id]
+    deleted = await write_tasks_versioned(
+        db,
+        user.id,
+        lambda version: delete(Tasks)
+        .where(*filters)
+        .returning(version)
+        .execution_options(synchronize_session=False),
+        *filters
+    )
 
-    if not task:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    db.delete(task)
-    db.commit()
+    version, = deleted[0]
+    await publish_task_event(db, user.id, "deleted", version, ids=[task_id])
+    await db.commit()
+    await task_list_cache.invalidate(user.id)
 
     return {"message": "Task deleted successfully"}
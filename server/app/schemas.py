@@ -1,5 +1,11 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, conint, field_validator, model_validator
+from typing import Any, Optional
+
+# Range of an Integer column; values outside it can never match a row, and
+# asyncpg rejects them as parameters rather than comparing
+MIN_INTEGER = -2**31
+MAX_INTEGER = 2**31 - 1
+IntegerValue = conint(ge=MIN_INTEGER, le=MAX_INTEGER)
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -26,7 +32,15 @@ class Token(BaseModel):
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
-    priority: int
+    priority: IntegerValue
+
+    @field_validator("title", "description")
+    @classmethod
+    def reject_nul(cls, value):
+        # PostgreSQL text cannot hold NUL
+        if value is not None and "\x00" in value:
+            raise ValueError("must not contain NUL characters")
+        return value
 
 class TaskResponse(BaseModel):
     id: int
@@ -39,6 +53,63 @@ class TaskResponse(BaseModel):
         from_attributes = True
 
 
+class TaskBulkError(BaseModel):
+    index: int
+    errors: list[dict[str, Any]]
+
+class TaskBulkResponse(BaseModel):
+    created: list[TaskResponse]
+    errors: list[TaskBulkError]
+
+
+class TaskImportError(BaseModel):
+    row: int
+    errors: list[dict[str, Any]]
+
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[TaskImportError]
+
+
+class TaskSelection(BaseModel):
+    ids: Optional[list[IntegerValue]] = None
+    complete: Optional[bool] = None
+    priority_min: Optional[IntegerValue] = None
+    priority_max: Optional[IntegerValue] = None
+    all: bool = False
+
+    @model_validator(mode="after")
+    def require_criteria(self):
+        # Acting on every task must be asked for explicitly
+        criteria = (self.ids, self.complete, self.priority_min, self.priority_max)
+        if not self.all and all(value is None for value in criteria):
+            raise ValueError("Select tasks by ids or a filter, or set all=true")
+        return self
+
+class TaskBulkResult(BaseModel):
+    affected: int
+
+
+class TaskChanges(BaseModel):
+    version: int
+    tasks: list[TaskResponse]
+    deleted: list[int]
+
+
+class TaskPriorityStats(BaseModel):
+    priority: int
+    total: int
+    completed: int
+    open: int
+
+class TaskStatsResponse(BaseModel):
+    total: int
+    completed: int
+    open: int
+    by_priority: list[TaskPriorityStats]
+
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -0,0 +1,61 @@
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import Select, column, false, func, literal_column, select, table, tuple_
+
+from .models import SEARCH_CONFIG, Tasks
+
+FTS5_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+tasks_fts = table("tasks_fts", column("rowid"))
+
+
+def fts5_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word, with no operators."""
+    return " ".join(f'"{token}"' for token in FTS5_TOKEN.findall(text))
+
+
+def task_search_query(
+    dialect: str,
+    user_id: int,
+    text: str,
+    after: list | None = None,
+    limit: int | None = None
+) -> Select:
+    """Rank the user's tasks against ``text``, best match first.
+
+    Selects ``(Tasks, rank)`` ordered by rank then id, both descending, so
+    pages can continue from the ``(rank, id)`` of the last row.
+    """
+    if dialect == "postgresql":
+        vector = literal_column("tasks.search_vector")
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+        rank = func.ts_rank(vector, ts_query)
+        query = select(Tasks, rank.label("rank")).where(
+            Tasks.user_id == user_id,
+            vector.op("@@")(ts_query)
+        )
+    elif dialect == "sqlite":
+        match = fts5_query(text)
+        # bm25() is lower for better matches
+        rank = -func.bm25(literal_column("tasks_fts"))
+        query = (
+            select(Tasks, rank.label("rank"))
+            .join(tasks_fts, tasks_fts.c.rowid == Tasks.id)
+            .where(Tasks.user_id == user_id)
+        )
+        if match:
+            query = query.where(literal_column("tasks_fts").op("MATCH")(match))
+        else:
+            query = query.where(false())
+    else:
+        raise HTTPException(status_code=501, detail="Search is not available")
+
+    if after is not None:
+        query = query.where(tuple_(rank, Tasks.id) < tuple_(*after))
+
+    query = query.order_by(rank.desc(), Tasks.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
@@ -0,0 +1,350 @@
+"""Bulk-load synthetic users and tasks, e.g. to reproduce production-scale problems.
+
+    python -m app.seed --users 1000000 --tasks 10000000 --jobs 8
+
+Rows are appended after the ids already in the database. Every user
+shares one password (--password), hashed once up front instead of once
+per user, or a ready-made hash (--password-hash) to skip bcrypt
+entirely. Tasks per user follow --distribution: "zipf" and "lognormal"
+give a few users most of the tasks, as real usage does, and "uniform"
+gives everyone the same number.
+
+The same --seed always generates the same rows, whatever --jobs and
+--chunk-size are. Chunks are generated and loaded by --jobs processes in
+parallel, with COPY on PostgreSQL and executemany elsewhere (SQLite
+loads in one process, since it has a single writer). The secondary
+indexes on tasks are dropped during the load and rebuilt after it,
+unless --keep-indexes is given.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import asyncpg
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.engine import make_url
+
+from .config import settings
+from .hashing import hash_password
+from .models import Tasks, Users
+
+DEFAULT_PASSWORD = "password"
+
+USER_COLUMNS = (
+    "id", "email", "username", "first_name", "last_name",
+    "hashed_password", "is_active", "phone_number"
+)
+TASK_COLUMNS = ("id", "title", "description", "priority", "complete", "user_id")
+
+FIRST_NAMES = (
+    "Aarav", "Alice", "Amara", "Ben", "Carlos", "Chen", "Diya", "Elena", "Fatima", "Grace",
+    "Hiro", "Isla", "Jonas", "Kavya", "Liam", "Maya", "Noah", "Olga", "Priya", "Quinn",
+    "Rahul", "Sara", "Tomas", "Uma", "Victor", "Wei", "Yusuf", "Zoe",
+)
+LAST_NAMES = (
+    "Ahmed", "Brown", "Costa", "Das", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Jones",
+    "Kim", "Lopez", "Martin", "Nakamura", "Okafor", "Patel", "Rossi", "Shah", "Silva", "Smith",
+    "Tanaka", "Wang", "Weber", "Young",
+)
+VERBS = (
+    "Write", "Review", "Update", "Fix", "Plan", "Call", "Email", "Prepare", "Schedule",
+    "Clean up", "Refactor", "Test", "Book", "Pay", "Renew", "Draft", "Order", "Check",
+)
+OBJECTS = (
+    "quarterly report", "release notes", "design doc", "dentist appointment", "team offsite",
+    "budget spreadsheet", "login bug", "onboarding guide", "car insurance", "grocery list",
+    "server migration", "client invoice", "project roadmap", "flight to Berlin", "API docs",
+    "performance review", "database backup", "birthday gift", "landing page", "tax return",
+)
+DETAILS = (
+    "before Friday", "with the team", "for the next sprint", "and share the link",
+    "as discussed in standup", "if time allows", "first thing tomorrow", "before the deadline",
+    "and follow up by email", "with the latest numbers",
+)
+# Most tasks are low priority and most are still open
+PRIORITIES = (1, 2, 3)
+PRIORITY_WEIGHTS = (0.5, 0.35, 0.15)
+COMPLETE_RATE = 0.3
+INACTIVE_RATE = 0.02
+
+
+def task_counts(
+    users: int, tasks: int, distribution: str, skew: float, rng: random.Random
+) -> list[int]:
+    """Split ``tasks`` between ``users`` by the given distribution."""
+    if distribution == "uniform":
+        weights = [1.0] * users
+    elif distribution == "zipf":
+        # The r-th busiest user has 1/r**skew as many tasks as the busiest
+        weights = [1 / rank ** skew for rank in range(1, users + 1)]
+        rng.shuffle(weights)
+    elif distribution == "lognormal":
+        weights = [rng.lognormvariate(0, skew) for _ in range(users)]
+    else:
+        raise ValueError(f"Unknown distribution {distribution!r}")
+
+    total = sum(weights)
+    counts = [int(tasks * weight / total) for weight in weights]
+    # Rounding down leaves fewer than one task per user over
+    for index in rng.sample(range(users), tasks - sum(counts)):
+        counts[index] += 1
+    return counts
+
+
+def plan_chunks(first_user_id: int, counts: list[int], first_task_id: int, chunk_size: int):
+    """Cut the tasks into chunks of at most ``chunk_size`` rows, each a list
+    of (user_id, offset, tasks) runs starting at a known task id."""
+    chunks = []
+    runs, size, start = [], 0, first_task_id
+    for user_id, count in enumerate(counts, first_user_id):
+        offset = 0
+        while offset < count:
+            take = min(count - offset, chunk_size - size)
+            runs.append((user_id, offset, take))
+            size += take
+            offset += take
+            if size == chunk_size:
+                chunks.append((start, runs))
+                runs, start, size = [], start + size, 0
+    if runs:
+        chunks.append((start, runs))
+    return chunks
+
+
+# Each run of BLOCK rows gets its own generator, so a chunk starting
+# mid-run only replays the rest of one block to reach its first row and
+# the rows come out the same however the load is chunked
+BLOCK = 1024
+
+
+def _draws(key: str, start: int, stop: int, draw):
+    index = start
+    while index < stop:
+        block_start = index - index % BLOCK
+        rng = random.Random(f"{key}:{block_start}")
+        for _ in range(index - block_start):
+            draw(rng)
+        block_stop = min(stop, block_start + BLOCK)
+        for _ in range(block_stop - index):
+            yield draw(rng)
+        index = block_stop
+
+
+def _draw_user(rng: random.Random):
+    # Every row makes the same draws, so skipping rows is just drawing them
+    return (
+        rng.choice(FIRST_NAMES),
+        rng.choice(LAST_NAMES),
+        rng.random(),
+        1000000000 + rng.randrange(9000000000),
+    )
+
+
+def _draw_task(rng: random.Random):
+    title = f"{rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+    has_description = rng.random() < 0.7
+    description = f"{title} {rng.choice(DETAILS)}"
+    return (
+        title,
+        description if has_description else None,
+        rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+        rng.random() < COMPLETE_RATE,
+    )
+
+
+def user_rows(seed: int, first_id: int, count: int, hashed_password: str, inactive_rate: float):
+    user_ids = range(first_id, first_id + count)
+    draws = _draws(f"users:{seed}", first_id, first_id + count, _draw_user)
+    for user_id, (first_name, last_name, active, phone_number) in zip(user_ids, draws):
+        yield (
+            user_id,
+            f"{first_name}.{last_name}.{user_id}@example.com".lower(),
+            f"user{user_id}",
+            first_name,
+            last_name,
+            hashed_password,
+            active >= inactive_rate,
+            phone_number,
+        )
+
+
+def task_rows(seed: int, first_id: int, runs: list[tuple[int, int, int]]):
+    task_id = first_id
+    for user_id, offset, count in runs:
+        for task in _draws(f"tasks:{seed}:{user_id}", offset, offset + count, _draw_task):
+            yield (task_id, *task, user_id)
+            task_id += 1
+
+
+async def _copy(url: str, table: str, columns: tuple, rows: list[tuple]):
+    dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+    connection = await asyncpg.connect(dsn)
+    try:
+        # Losing the last rows of a crashed seed run is harmless
+        await connection.execute("SET synchronous_commit = off")
+        await connection.copy_records_to_table(table, records=rows, columns=columns)
+    finally:
+        await connection.close()
+
+
+def _write(url: str, table, columns: tuple, rows: list[tuple]):
+    if make_url(url).get_backend_name() == "postgresql":
+        asyncio.run(_copy(url, table.name, columns, rows))
+        return
+    # Otherwise SQLite: its driver takes the tuples as they are
+    engine = create_engine(url)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                rows
+            )
+    finally:
+        engine.dispose()
+
+
+def load_users(
+    url: str, seed: int, first_id: int, count: int, hashed_password: str, inactive_rate: float
+) -> int:
+    rows = list(user_rows(seed, first_id, count, hashed_password, inactive_rate))
+    _write(url, Users.__table__, USER_COLUMNS, rows)
+    return count
+
+
+def load_tasks(url: str, seed: int, first_id: int, runs: list[tuple[int, int, int]]) -> int:
+    rows = list(task_rows(seed, first_id, runs))
+    _write(url, Tasks.__table__, TASK_COLUMNS, rows)
+    return len(rows)
+
+
+def _run_chunks(executor, function, url: str, chunks: list[tuple], label: str):
+    if not chunks:
+        return
+    start = time.perf_counter()
+    total = 0
+    if executor is None:
+        results = (function(url, *chunk) for chunk in chunks)
+    else:
+        results = executor.map(function, *zip(*((url, *chunk) for chunk in chunks)))
+    for done in results:
+        total += done
+        elapsed = time.perf_counter() - start
+        print(f"\r{label}: {total:,} rows, {total / elapsed:,.0f}/s", end="", flush=True)
+    print()
+
+
+def load(
+    url: str,
+    users: int,
+    tasks: int,
+    distribution: str = "zipf",
+    skew: float = 1.0,
+    password: str = DEFAULT_PASSWORD,
+    seed: int = 0,
+    jobs: int = 1,
+    chunk_size: int = 50_000,
+    keep_indexes: bool = False,
+    inactive_rate: float = INACTIVE_RATE,
+    password_hash: str | None = None,
+):
+    """Append ``users`` users and ``tasks`` tasks to the database at ``url``."""
+    engine = create_engine(url)
+    postgres = engine.dialect.name == "postgresql"
+    if not postgres:
+        jobs = 1
+
+    with engine.connect() as conn:
+        first_user_id = (conn.scalar(select(func.max(Users.id))) or 0) + 1
+        first_task_id = (conn.scalar(select(func.max(Tasks.id))) or 0) + 1
+
+    rng = random.Random(seed)
+    counts = task_counts(users, tasks, distribution, skew, rng)
+    hashed_password = password_hash or hash_password(password)
+
+    user_chunks = [
+        (
+            seed, first_id, min(chunk_size, first_user_id + users - first_id),
+            hashed_password, inactive_rate
+        )
+        for first_id in range(first_user_id, first_user_id + users, chunk_size)
+    ]
+    task_chunks = [
+        (seed, first_id, runs)
+        for first_id, runs in plan_chunks(first_user_id, counts, first_task_id, chunk_size)
+    ]
+
+    # Building each index once at the end beats updating it row by row
+    indexes = [] if keep_indexes else [
+        index for index in Tasks.__table__.indexes if index.name != "ix_tasks_id"
+    ]
+    executor = None
+    try:
+        for index in indexes:
+            index.drop(bind=engine, checkfirst=True)
+        if jobs > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+            )
+        _run_chunks(executor, load_users, url, user_chunks, "users")
+        _run_chunks(executor, load_tasks, url, task_chunks, "tasks")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        # Even after a failed load, the database must keep its indexes
+        start = time.perf_counter()
+        for index in indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    if postgres:
+        with engine.begin() as conn:
+            # Rows loaded with explicit ids leave the sequences behind
+            for table in ("users", "tasks"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT max(id) FROM {table}))"
+                ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"indexes and stats: {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--distribution", choices=["zipf", "lognormal", "uniform"], default="zipf")
+    parser.add_argument("--skew", type=float, default=1.0,
+                        help="zipf exponent, or lognormal sigma")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--password-hash", help="use this bcrypt hash instead of hashing --password")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--keep-indexes", action="store_true")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    load(
+        args.database_url,
+        args.users,
+        args.tasks,
+        distribution=args.distribution,
+        skew=args.skew,
+        password=args.password,
+        seed=args.seed,
+        jobs=args.jobs,
+        chunk_size=args.chunk_size,
+        keep_indexes=args.keep_indexes,
+        password_hash=args.password_hash,
+    )
+    print(f"Loaded {args.users:,} users and {args.tasks:,} tasks in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
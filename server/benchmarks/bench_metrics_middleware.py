@@ -0,0 +1,100 @@
+"""Per-request overhead of MetricsMiddleware.
+
+Drives apps through the ASGI interface directly (no server or sockets):
+
+- a bare ASGI app that sends a fixed response, with and without the
+  middleware, isolating the middleware's own cost
+- two copies of a minimal FastAPI app with one JSON route, one of them
+  instrumented, putting that cost next to the framework's
+
+Apps run in interleaved rounds and the fastest round of each is reported.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.bench_metrics_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from app.middleware import MetricsMiddleware
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/tasks/{task_id}")
+    async def read_task(task_id: int):
+        return {"id": task_id, "title": "Task", "complete": False}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/tasks/1",
+        "raw_path": b"/tasks/1",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("bench", 1),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        # The router writes into the scope, so every request gets its own
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - start
+
+
+async def compare(label: str, plain, instrumented, requests: int, rounds: int):
+    apps = {"plain": plain, "instrumented": instrumented}
+    for app in apps.values():
+        await drive(app, 1000)
+
+    best = {name: float("inf") for name in apps}
+    for _ in range(rounds):
+        for name, app in apps.items():
+            best[name] = min(best[name], await drive(app, requests))
+
+    per_request = {name: best[name] / requests * 1e6 for name in apps}
+    overhead = per_request["instrumented"] - per_request["plain"]
+    print(
+        f"{label:<10}{per_request['plain']:>10.1f}{per_request['instrumented']:>14.1f}"
+        f"{overhead:>11.1f}{overhead / per_request['plain']:>10.1%}"
+    )
+
+
+async def main(requests: int, rounds: int):
+    print(f"{'app':<10}{'plain us':>10}{'instrumented':>14}{'overhead':>11}{'':>10}")
+    await compare("bare ASGI", bare_app, MetricsMiddleware(bare_app), requests, rounds)
+    await compare("FastAPI", make_app(False), make_app(True), requests, rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
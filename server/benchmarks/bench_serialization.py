@@ -0,0 +1,113 @@
+"""Throughput of the GET /tasks/ response path: ORM + TaskResponse vs rows + orjson.
+
+Loads one user's tasks into an in-memory SQLite database, then for each list
+size times fetching and encoding the list both ways:
+
+- orm: select(Tasks) entities, validated through list[TaskResponse] with
+  from_attributes and encoded with the stdlib json module, as FastAPI does
+  for a handler returning ORM objects with a response_model
+- rows: select(*TASK_COLUMNS) rows encoded directly with orjson, as
+  get_my_tasks now does
+
+Both bodies are checked to decode to the same JSON before timing.
+
+Run from the ``server`` directory:
+
+    python -m benchmarks.bench_serialization --sizes 100 10000 100000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.crud import TASK_COLUMNS, task_list_query
+from app.database import Base
+from app.models import Tasks, Users
+from app.responses import rows_response
+from app.schemas import TaskResponse
+
+task_list = TypeAdapter(list[TaskResponse])
+
+
+def load_data(engine, tasks: int):
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(Users), [{
+            "id": 1,
+            "email": "bench@example.com",
+            "username": "bench",
+            "hashed_password": "x",
+            "phone_number": 1000000000,
+        }])
+        conn.execute(insert(Tasks), [
+            {
+                "id": task_id,
+                "title": f"Task {task_id}",
+                "description": "Synthetic benchmark task" if rng.random() < 0.8 else None,
+                "priority": rng.randint(1, 3),
+                "complete": rng.random() < 0.5,
+                "user_id": 1,
+            }
+            for task_id in range(1, tasks + 1)
+        ])
+
+
+def orm_path(db: Session, size: int) -> bytes:
+    tasks = db.execute(task_list_query(1, limit=size)).scalars().all()
+    content = task_list.dump_python(
+        task_list.validate_python(tasks, from_attributes=True), mode="json"
+    )
+    body = JSONResponse(content).body
+    db.expunge_all()
+    return body
+
+
+def rows_path(db: Session, size: int) -> bytes:
+    rows = db.execute(task_list_query(1, limit=size, columns=TASK_COLUMNS)).all()
+    return rows_response(rows).body
+
+
+def measure(engine, path, size: int, repeat: int) -> float:
+    timings = []
+    with Session(engine) as db:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            path(db, size)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="runs per size (default scales down with size)")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    load_data(engine, max(args.sizes))
+
+    print(f"{'tasks':>8}{'orm':>12}{'rows':>12}{'orm tasks/s':>14}{'rows tasks/s':>14}{'speedup':>9}")
+    for size in args.sizes:
+        with Session(engine) as db:
+            assert json.loads(orm_path(db, size)) == json.loads(rows_path(db, size))
+
+        repeat = args.repeat or max(5, min(200, 1_000_000 // size))
+        orm = measure(engine, orm_path, size, repeat)
+        rows = measure(engine, rows_path, size, repeat)
+        print(
+            f"{size:>8}{orm * 1000:>10.2f}ms{rows * 1000:>10.2f}ms"
+            f"{size / orm:>14,.0f}{size / rows:>14,.0f}{orm / rows:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Worker startup time: lazy app import vs create_all at import.
+
+Boots N worker processes at once, the way ``uvicorn --workers N`` or a
+scaled-out deploy does, each of them either:
+
+- lazy: importing app.main, which now opens no database connection
+- create_all: importing app.main and then running
+  Base.metadata.create_all, which every worker used to do at import
+
+Each worker reports how long it took to become ready; the table shows the
+median and slowest worker and the wall time until all were ready, plus how
+many workers failed. With --empty every create_all round starts from an
+empty database, so the workers race to create the same tables.
+
+The database must already be migrated (``alembic upgrade head``) unless
+--empty is given. Run from the ``server`` directory:
+
+    python -m benchmarks.bench_startup --url postgresql://... --workers 1 8 32
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+BOOT = """
+import time
+start = time.perf_counter()
+import app.main
+if {create_all}:
+    from app.database import Base, engine
+    Base.metadata.create_all(bind=engine)
+print(time.perf_counter() - start)
+"""
+
+
+def boot(url: str, workers: int, create_all: bool) -> tuple[list[float], float, int]:
+    env = {
+        **os.environ,
+        "SQLALCHEMY_DATABASE_URL": url,
+        "PASSWORD_HASH_WORKERS": "0",
+        "PYTHONPATH": os.getcwd(),
+    }
+    code = BOOT.format(create_all=create_all)
+    start = time.perf_counter()
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", code], env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        for _ in range(workers)
+    ]
+    outputs = [process.communicate()[0] for process in processes]
+    wall = time.perf_counter() - start
+    ready = [
+        float(output) for process, output in zip(processes, outputs)
+        if process.returncode == 0
+    ]
+    return ready, wall, workers - len(ready)
+
+
+def empty_database(url: str):
+    from app import models  # noqa: F401
+    from app.database import Base
+
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=os.environ.get("SQLALCHEMY_DATABASE_URL"),
+                        help="database to boot against (default SQLALCHEMY_DATABASE_URL)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--empty", action="store_true",
+                        help="drop every table before each create_all round")
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("--url or SQLALCHEMY_DATABASE_URL is required")
+
+    # Warm the filesystem cache so the first round is not penalised
+    boot(args.url, 1, False)
+
+    print(f"{'mode':<12}{'workers':>8}{'median':>11}{'slowest':>11}{'all ready':>11}{'failed':>8}")
+    for workers in args.workers:
+        for create_all in (False, True):
+            ready, walls, failed = [], [], 0
+            for _ in range(args.rounds):
+                if create_all and args.empty:
+                    empty_database(args.url)
+                round_ready, wall, round_failed = boot(args.url, workers, create_all)
+                ready += round_ready
+                walls.append(wall)
+                failed += round_failed
+            median = statistics.median(ready) * 1000 if ready else float("nan")
+            slowest = max(ready) * 1000 if ready else float("nan")
+            print(
+                f"{'create_all' if create_all else 'lazy':<12}{workers:>8}"
+                f"{median:>9.0f}ms{slowest:>9.0f}ms{statistics.median(walls) * 1000:>9.0f}ms"
+                f"{failed:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool, text
+
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.config import settings
+from app.database import Base
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Full-text search objects are created by raw DDL in the migrations and are
+# not part of the mapped metadata, so autogenerate must leave them alone
+UNMANAGED = {"search_vector", "ix_tasks_search_vector"}
+
+# Any constant works; it only has to be the same for every deploy
+MIGRATION_LOCK_ID = 7241_0001
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if name is None:
+        return True
+    return name not in UNMANAGED and not name.startswith("tasks_fts")
+
+
+def database_url() -> str:
+    return (
+        context.get_x_argument(as_dictionary=True).get("url")
+        or config.get_main_option("sqlalchemy.url")
+        or settings.SQLALCHEMY_DATABASE_URL
+    )
+
+
+def run_migrations_offline():
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(database_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        is_postgres = connection.dialect.name == "postgresql"
+        if is_postgres:
+            # Deploys that start several migrators at once run them one
+            # after another; the later ones find nothing left to do
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                include_object=include_object,
+                # SQLite cannot ALTER most things in place
+                render_as_batch=connection.dialect.name == "sqlite",
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if is_postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,51 @@
+"""Initial schema: users and tasks
+
+The tables as the app created them at startup before migrations. A
+database already created that way is brought under migrations with
+``alembic stamp 0001`` followed by ``alembic upgrade head``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), unique=True),
+        sa.Column("username", sa.String(), unique=True),
+        sa.Column("first_name", sa.String()),
+        sa.Column("last_name", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("phone_number", sa.BigInteger(), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+
+    op.create_table(
+        "tasks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String()),
+        sa.Column("description", sa.String()),
+        sa.Column("priority", sa.Integer()),
+        sa.Column("complete", sa.Boolean()),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_tasks_id", "tasks", ["id"])
+
+
+def downgrade():
+    op.drop_index("ix_tasks_id", table_name="tasks")
+    op.drop_table("tasks")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
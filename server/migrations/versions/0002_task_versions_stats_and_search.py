@@ -0,0 +1,109 @@
+"""Task versions, tombstones, stats, list indexes and full-text search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+TASK_INDEXES = {
+    "ix_tasks_user_id_id": ["user_id", "id"],
+    "ix_tasks_user_id_priority_id": ["user_id", "priority", "id"],
+    "ix_tasks_user_id_complete_id": ["user_id", "complete", "id"],
+    "ix_tasks_user_id_complete_priority_id": ["user_id", "complete", "priority", "id"],
+    "ix_tasks_user_id_version_id": ["user_id", "version", "id"],
+}
+
+POSTGRES_SEARCH = [
+    """ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))
+    ) STORED""",
+    "CREATE INDEX ix_tasks_search_vector ON tasks USING gin (search_vector)",
+]
+
+SQLITE_SEARCH = [
+    """CREATE VIRTUAL TABLE tasks_fts USING fts5(
+        title, description, content='tasks', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+    """CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+
+def upgrade():
+    op.add_column(
+        "users",
+        sa.Column("task_version", sa.BigInteger(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "tasks",
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0")
+    )
+    for name, columns in TASK_INDEXES.items():
+        op.create_index(name, "tasks", columns)
+
+    op.create_table(
+        "task_tombstones",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("version", sa.BigInteger(), primary_key=True),
+        sa.Column("task_id", sa.Integer(), primary_key=True),
+    )
+
+    op.create_table(
+        "task_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("priority", sa.Integer(), primary_key=True),
+        sa.Column("total", sa.BigInteger(), nullable=False),
+        sa.Column("completed", sa.BigInteger(), nullable=False),
+    )
+    op.execute("""INSERT INTO task_stats (user_id, priority, total, completed)
+        SELECT user_id, priority, count(*), sum(CASE WHEN complete THEN 1 ELSE 0 END)
+        FROM tasks
+        WHERE user_id IS NOT NULL AND priority IS NOT NULL
+        GROUP BY user_id, priority""")
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_SEARCH:
+            op.execute(statement)
+    elif dialect == "sqlite":
+        for statement in SQLITE_SEARCH:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.drop_index("ix_tasks_search_vector", table_name="tasks")
+        op.drop_column("tasks", "search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("tasks_fts_insert", "tasks_fts_delete", "tasks_fts_update"):
+            op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE tasks_fts")
+
+    op.drop_table("task_stats")
+    op.drop_table("task_tombstones")
+    for name in TASK_INDEXES:
+        op.drop_index(name, table_name="tasks")
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("version")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("task_version")
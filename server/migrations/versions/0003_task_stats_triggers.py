@@ -0,0 +1,101 @@
+"""Maintain task stats and tombstones with triggers on tasks
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ["tasks_count_insert", "tasks_count_update", "tasks_count_delete"]
+
+
+def count_tasks(changes: str) -> str:
+    return f"""INSERT INTO task_stats (user_id, priority, total, completed)
+        SELECT user_id, priority, sum(total), sum(completed)
+        FROM ({changes}) AS changes
+        WHERE user_id IS NOT NULL AND priority IS NOT NULL
+        GROUP BY user_id, priority
+        HAVING sum(total) <> 0 OR sum(completed) <> 0
+        ORDER BY user_id, priority
+        ON CONFLICT (user_id, priority) DO UPDATE SET
+            total = task_stats.total + excluded.total,
+            completed = task_stats.completed + excluded.completed"""
+
+
+def task_deltas(rows: str, sign: int) -> str:
+    return f"""SELECT {rows}.user_id AS user_id, {rows}.priority AS priority, {sign} AS total,
+        CASE WHEN {rows}.complete THEN {sign} ELSE 0 END AS completed"""
+
+
+POSTGRES_TRIGGERS = [
+    f"""CREATE OR REPLACE FUNCTION tasks_count_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {count_tasks(task_deltas("new_tasks", 1) + " FROM new_tasks")};
+        RETURN NULL;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION tasks_count_update() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {count_tasks(
+            task_deltas("new_tasks", 1) + " FROM new_tasks UNION ALL "
+            + task_deltas("old_tasks", -1) + " FROM old_tasks"
+        )};
+        RETURN NULL;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION tasks_count_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        {count_tasks(task_deltas("old_tasks", -1) + " FROM old_tasks")};
+        INSERT INTO task_tombstones (user_id, version, task_id)
+        SELECT old_tasks.user_id, users.task_version, old_tasks.id
+        FROM old_tasks JOIN users ON users.id = old_tasks.user_id;
+        RETURN NULL;
+    END $$""",
+    """CREATE TRIGGER tasks_count_insert AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_insert()""",
+    """CREATE TRIGGER tasks_count_update AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_tasks NEW TABLE AS new_tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_update()""",
+    """CREATE TRIGGER tasks_count_delete AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_count_delete()""",
+]
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER tasks_count_insert AFTER INSERT ON tasks BEGIN
+        {count_tasks(task_deltas("new", 1))};
+    END""",
+    f"""CREATE TRIGGER tasks_count_update AFTER UPDATE OF user_id, priority, complete ON tasks BEGIN
+        {count_tasks(task_deltas("new", 1) + " UNION ALL " + task_deltas("old", -1))};
+    END""",
+    f"""CREATE TRIGGER tasks_count_delete AFTER DELETE ON tasks BEGIN
+        {count_tasks(task_deltas("old", -1))};
+        INSERT INTO task_tombstones (user_id, version, task_id)
+        SELECT old.user_id, task_version, old.id FROM users WHERE id = old.user_id;
+    END""",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_TRIGGERS:
+            op.execute(statement)
+    elif dialect == "sqlite":
+        for statement in SQLITE_TRIGGERS:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for trigger in TRIGGERS:
+        if dialect == "postgresql":
+            op.execute(f"DROP TRIGGER {trigger} ON tasks")
+            op.execute(f"DROP FUNCTION {trigger}()")
+        elif dialect == "sqlite":
+            op.execute(f"DROP TRIGGER {trigger}")
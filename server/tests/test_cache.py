@@ -0,0 +1,136 @@
+import asyncio
+
+import fakeredis
+import pytest
+import redis.asyncio as redis
+
+from app.cache import GenerationalCache, MemoryBackend, RedisBackend
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_cache(request):
+    """Build a cache on each backend; Redis is a local in-memory stand-in"""
+    def make(ttl=60, max_value_bytes=1024):
+        if request.param == "memory":
+            backend = MemoryBackend(f"test_{request.param}", max_bytes=1024 * 1024)
+        else:
+            backend = RedisBackend(client=fakeredis.FakeAsyncRedis())
+        return GenerationalCache("test", backend, ttl=ttl, max_value_bytes=max_value_bytes)
+    return make
+
+
+class TestGenerationalCache:
+    """Test cases for per-owner caching and invalidation"""
+    
+    def test_miss_then_hit(self, make_cache):
+        """Test that a stored value is served for the same owner and key"""
+        cache = make_cache()
+        
+        async def scenario():
+            generation, value = await cache.get(1, "page")
+            assert value is None
+            await cache.set(1, "page", generation, b"body")
+            return await cache.get(1, "page"), await cache.get(2, "page")
+        
+        (_, mine), (_, theirs) = run(scenario())
+        
+        assert mine == b"body"
+        assert theirs is None
+    
+    def test_invalidate_drops_every_key(self, make_cache):
+        """Test that invalidating an owner drops all its values at once"""
+        cache = make_cache()
+        
+        async def scenario():
+            for key in ("a", "b"):
+                generation, _ = await cache.get(1, key)
+                await cache.set(1, key, generation, b"body")
+            await cache.invalidate(1)
+            return [(await cache.get(1, key))[1] for key in ("a", "b")]
+        
+        assert run(scenario()) == [None, None]
+    
+    def test_read_racing_a_write_is_never_served(self, make_cache):
+        """Test that a value read before an invalidation is not stored for later"""
+        cache = make_cache()
+        
+        async def scenario():
+            generation, _ = await cache.get(1, "page")
+            # A write commits and invalidates while the read is in flight
+            await cache.invalidate(1)
+            await cache.set(1, "page", generation, b"stale")
+            return (await cache.get(1, "page"))[1]
+        
+        assert run(scenario()) is None
+    
+    def test_large_values_are_not_stored(self, make_cache):
+        """Test that values above max_value_bytes are skipped"""
+        cache = make_cache(max_value_bytes=8)
+        
+        async def scenario():
+            generation, _ = await cache.get(1, "page")
+            await cache.set(1, "page", generation, b"x" * 9)
+            return (await cache.get(1, "page"))[1]
+        
+        assert run(scenario()) is None
+    
+    def test_disabled_cache_always_misses(self):
+        """Test that a cache without a backend stores nothing"""
+        cache = GenerationalCache("test", None, ttl=60, max_value_bytes=1024)
+        
+        async def scenario():
+            generation, _ = await cache.get(1, "page")
+            await cache.set(1, "page", generation, b"body")
+            await cache.invalidate(1)
+            return await cache.get(1, "page")
+        
+        assert run(scenario()) == (None, None)
+    
+    def test_unavailable_backend_misses(self):
+        """Test that a Redis outage degrades to cache misses, not errors"""
+        client = redis.Redis(port=1, socket_connect_timeout=0.1)
+        cache = GenerationalCache("test", RedisBackend(client=client), ttl=60, max_value_bytes=1024)
+        
+        async def scenario():
+            generation, value = await cache.get(1, "page")
+            await cache.set(1, "page", generation, b"body")
+            await cache.invalidate(1)
+            return generation, value
+        
+        assert run(scenario()) == (None, None)
+
+
+class TestMemoryBackend:
+    """Test cases for the byte-bounded in-process LRU"""
+    
+    def test_evicts_least_recently_used_over_max_bytes(self):
+        """Test that the oldest unused values go first once over budget"""
+        backend = MemoryBackend("test_lru", max_bytes=10)
+        
+        async def scenario():
+            await backend.set("a", b"aaaa", 60)
+            await backend.set("b", b"bbbb", 60)
+            await backend.get_many(["a"])
+            await backend.set("c", b"cccc", 60)
+            return await backend.get_many(["a", "b", "c"])
+        
+        assert run(scenario()) == [b"aaaa", None, b"cccc"]
+        assert backend._size == 8
+    
+    def test_expired_values_are_dropped(self, monkeypatch):
+        """Test that values are not served past their TTL"""
+        backend = MemoryBackend("test_ttl", max_bytes=100)
+        clock = [1000.0]
+        monkeypatch.setattr("app.cache.time.monotonic", lambda: clock[0])
+        
+        async def scenario():
+            await backend.set("a", b"value", 5)
+            clock[0] += 6
+            return await backend.get_many(["a"]), await backend.add("a", b"new", 5)
+        
+        assert run(scenario()) == ([None], True)
+        assert backend._size == 3
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import async_url
+from app.events import RESET, MemoryBroker, PostgresBroker, format_event
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+
+async def publish(url, broker, user_id, event, commit=True):
+    """Publish through a real session, then commit or roll back"""
+    engine = create_async_engine(async_url(url), poolclass=NullPool)
+    async with async_sessionmaker(engine)() as db:
+        await db.execute(select(1))
+        await broker.publish(db, user_id, event)
+        if commit:
+            await db.commit()
+        else:
+            await db.rollback()
+    await engine.dispose()
+
+
+async def next_event(subscription, timeout=1.0):
+    try:
+        return await subscription.get(timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+class TestMemoryBroker:
+    """Test cases for in-process event delivery"""
+    
+    def test_delivers_after_commit(self, database_url):
+        """Test that subscribers of the user receive committed events"""
+        broker = MemoryBroker(queue_size=10)
+        
+        async def scenario():
+            with broker.subscribe(1) as mine, broker.subscribe(2) as theirs:
+                await publish(database_url, broker, 1, {"type": "deleted", "version": 3, "ids": [7]})
+                return await next_event(mine), await next_event(theirs, timeout=0.1)
+        
+        assert run(scenario()) == ({"type": "deleted", "version": 3, "ids": [7]}, None)
+    
+    def test_discards_on_rollback(self, database_url):
+        """Test that events of a rolled back transaction are never delivered"""
+        broker = MemoryBroker(queue_size=10)
+        
+        async def scenario():
+            with broker.subscribe(1) as subscription:
+                await publish(database_url, broker, 1, {"type": "deleted", "version": 3}, commit=False)
+                return await next_event(subscription, timeout=0.1)
+        
+        assert run(scenario()) is None
+    
+    def test_slow_subscriber_is_reset(self):
+        """Test that an overflowing backlog collapses into a reset event"""
+        broker = MemoryBroker(queue_size=2)
+        
+        async def scenario():
+            with broker.subscribe(1) as subscription:
+                for version in range(3):
+                    broker.deliver(1, {"type": "deleted", "version": version})
+                await asyncio.sleep(0)
+                return [await next_event(subscription, timeout=0.1) for _ in range(2)]
+        
+        assert run(scenario()) == [RESET, None]
+    
+    def test_unsubscribes_on_exit(self):
+        """Test that closed streams stop receiving events"""
+        broker = MemoryBroker(queue_size=10)
+        
+        async def scenario():
+            with broker.subscribe(1):
+                pass
+            broker.deliver(1, {"type": "reset"})
+        
+        run(scenario())
+        
+        assert broker._subscribers == {}
+
+
+class TestPostgresBroker:
+    """Test cases for LISTEN/NOTIFY delivery across connections"""
+    
+    def test_delivers_committed_events_only(self, database_url):
+        """Test that NOTIFY reaches listeners on commit and not on rollback"""
+        if make_url(database_url).get_backend_name() != "postgresql":
+            pytest.skip("LISTEN/NOTIFY needs PostgreSQL")
+        broker = PostgresBroker(database_url, queue_size=10)
+        
+        async def scenario():
+            await broker.start()
+            try:
+                await asyncio.wait_for(broker.listening.wait(), 5)
+                with broker.subscribe(1) as subscription:
+                    await publish(database_url, broker, 1, {"type": "deleted", "version": 1}, commit=False)
+                    await publish(database_url, broker, 1, {"type": "deleted", "version": 2})
+                    return await next_event(subscription), await next_event(subscription, 0.2)
+            finally:
+                await broker.stop()
+        
+        assert run(scenario()) == ({"type": "deleted", "version": 2}, None)
+
+
+class TestFormatEvent:
+    """Test cases for Server-Sent Events encoding"""
+    
+    def test_event_with_version(self):
+        """Test that the version becomes the event id"""
+        message = format_event({"type": "deleted", "version": 4, "ids": [1]})
+        
+        assert message == 'id: 4\nevent: deleted\ndata: {"type":"deleted","version":4,"ids":[1]}\n\n'
+    
+    def test_event_without_version(self):
+        """Test that events without a version carry no id"""
+        assert format_event(RESET) == 'event: reset\ndata: {"type":"reset"}\n\n'
@@ -0,0 +1,239 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.database import (
+    InstrumentedQueuePool, QueryProfile, async_url, observe_pool, pool_options, profile_queries
+)
+from app.metrics import Counter, Gauge, Histogram, Registry
+from app.middleware import QueryProfileMiddleware
+
+
+@pytest.fixture
+def registry():
+    """A fresh registry so tests do not see each other's metrics"""
+    return Registry()
+
+
+class TestRegistry:
+    """Test cases for the Prometheus text rendering"""
+    
+    def test_counter(self, registry):
+        """Test that labelled counters render one sample per label set"""
+        counter = Counter("requests_total", "Requests.", ["method"], registry=registry)
+        counter.labels(method="GET").inc()
+        counter.labels(method="GET").inc(2)
+        counter.labels(method="POST").inc()
+        
+        body = registry.render()
+        
+        assert "# TYPE requests_total counter" in body
+        assert 'requests_total{method="GET"} 3' in body
+        assert 'requests_total{method="POST"} 1' in body
+    
+    def test_unlabelled_metric_starts_at_zero(self, registry):
+        """Test that unlabelled metrics are exported before first use"""
+        Counter("errors_total", "Errors.", registry=registry)
+        
+        assert "errors_total 0" in registry.render()
+    
+    def test_gauge_function(self, registry):
+        """Test that function gauges are read at render time"""
+        values = [1]
+        Gauge("queue_depth", "Depth.", registry=registry).set_function(lambda: values[-1])
+        values.append(7)
+        
+        assert "queue_depth 7" in registry.render()
+    
+    def test_histogram(self, registry):
+        """Test that histogram buckets are cumulative"""
+        histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value)
+        
+        body = registry.render()
+        
+        assert 'latency_seconds_bucket{le="0.1"} 1' in body
+        assert 'latency_seconds_bucket{le="1"} 3' in body
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in body
+        assert "latency_seconds_sum 6.05" in body
+        assert "latency_seconds_count 4" in body
+    
+    def test_duplicate_name_rejected(self, registry):
+        """Test that a metric name can only be registered once"""
+        Counter("dup_total", "First.", registry=registry)
+        
+        with pytest.raises(ValueError):
+            Counter("dup_total", "Second.", registry=registry)
+
+
+class TestPoolMetrics:
+    """Test cases for connection pool metrics"""
+    
+    def test_pool_occupancy_and_wait(self, client, database_url):
+        """Test that checkouts are timed and occupancy is exported"""
+        engine = create_engine(database_url, **pool_options(database_url))
+        if not isinstance(engine.pool, InstrumentedQueuePool):
+            pytest.skip("SQLite keeps its own pools")
+        observe_pool(engine, "test")
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                body = client.get("/metrics").text
+                assert 'app_db_pool_connections{engine="test",state="checked_out"} 1' in body
+            
+            body = client.get("/metrics").text
+            assert 'app_db_pool_connections{engine="test",state="checked_out"} 0' in body
+            assert 'app_db_pool_connections{engine="test",state="idle"} 1' in body
+            assert 'app_db_pool_checkout_wait_seconds_count{engine="sync"}' in body
+        finally:
+            engine.dispose()
+
+
+def sample(body, name):
+    """Value of the sample named exactly ``name`` (labels included), or 0"""
+    for line in body.splitlines():
+        if line.rsplit(" ", 1)[0] == name:
+            return float(line.rsplit(" ", 1)[1])
+    return 0
+
+
+class TestRequestMetrics:
+    """Test cases for per-route request metrics"""
+    
+    def test_requests_counted_per_route_and_status(self, client):
+        """Test that requests are labelled with the route template and status"""
+        name = 'app_http_request_duration_seconds_count{method="PUT",route="/tasks/{task_id}",status="401"}'
+        before = sample(client.get("/metrics").text, name)
+        
+        client.put("/tasks/1")
+        client.put("/tasks/2")
+        
+        assert sample(client.get("/metrics").text, name) == before + 2
+    
+    def test_unmatched_paths_share_a_label(self, client):
+        """Test that unknown paths do not create a label per path"""
+        client.get("/no/such/path")
+        client.get("/another/missing/path")
+        
+        body = client.get("/metrics").text
+        
+        assert 'route="unmatched",status="404"' in body
+        assert "/no/such/path" not in body
+    
+    def test_unknown_methods_share_a_label(self, client):
+        """Test that arbitrary methods are folded into OTHER"""
+        client.request("BREW", "/")
+        
+        body = client.get("/metrics").text
+        
+        assert 'method="OTHER",route="/",status="405"' in body
+        assert "BREW" not in body
+    
+    def test_latency_buckets_exported(self, client):
+        """Test that the histogram exposes buckets, sum and count"""
+        client.get("/")
+        
+        body = client.get("/metrics").text
+        
+        assert 'app_http_request_duration_seconds_bucket{method="GET",route="/",status="200",le="+Inf"}' in body
+        assert 'app_http_request_duration_seconds_sum{method="GET",route="/",status="200"}' in body
+    
+    def test_in_flight_returns_to_zero(self, client):
+        """Test that finished requests are no longer counted as in flight"""
+        client.post("/tasks/")
+        
+        body = client.get("/metrics").text
+        
+        assert 'app_http_requests_in_flight{method="POST"} 0' in body
+        # The scrape itself is the only GET in flight
+        assert 'app_http_requests_in_flight{method="GET"} 1' in body
+
+
+@pytest.fixture
+def profiled_app(database_url):
+    """A small app whose only route runs a statement ``n`` times"""
+    engine = create_async_engine(async_url(database_url), poolclass=NullPool)
+    profiled = FastAPI()
+    profiled.add_middleware(QueryProfileMiddleware)
+    
+    @profiled.get("/run/{n}")
+    async def run_statements(n: int):
+        async with engine.connect() as conn:
+            for value in range(n):
+                await conn.execute(text("SELECT CAST(:value AS integer)"), {"value": value})
+        return {"ran": n}
+    
+    yield TestClient(profiled)
+
+
+class TestQueryProfiling:
+    """Test cases for per-request SQL profiling"""
+    
+    def test_profile_records_statements(self, database_url):
+        """Test that statements inside the context are counted and timed"""
+        engine = create_engine(database_url, poolclass=NullPool)
+        with profile_queries() as profile, engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        
+        assert profile.count == 2
+        assert profile.duration > 0
+        assert len(profile.slowest) == 2
+    
+    def test_slowest_keeps_the_top_statements(self):
+        """Test that only the slowest few statements are kept"""
+        profile = QueryProfile()
+        for index, duration in enumerate([0.1, 0.5, 0.2, 0.9, 0.3]):
+            profile.record(f"SELECT {index}", duration)
+        
+        assert sorted(profile.slowest, reverse=True) == [
+            (0.9, "SELECT 3"), (0.5, "SELECT 1"), (0.3, "SELECT 4")
+        ]
+    
+    def test_debug_header(self, profiled_app, monkeypatch):
+        """Test that the header reports the request's statements, async engine included"""
+        monkeypatch.setattr(settings, "SQL_PROFILE_HEADER", True)
+        
+        response = profiled_app.get("/run/3")
+        
+        assert response.headers["X-DB-Queries"] == "3"
+        assert response.headers["Server-Timing"].startswith("db;dur=")
+    
+    def test_no_header_by_default(self, profiled_app):
+        """Test that profiles stay out of responses unless enabled"""
+        response = profiled_app.get("/run/1")
+        
+        assert "X-DB-Queries" not in response.headers
+    
+    def test_repeated_statement_flagged(self, profiled_app, caplog):
+        """Test that one statement run in a loop is logged as a probable N+1"""
+        with caplog.at_level(logging.WARNING, logger="app.middleware"):
+            profiled_app.get(f"/run/{settings.SQL_REPEATED_QUERY_THRESHOLD}")
+        
+        assert "Probable N+1 in GET /run/{n}" in caplog.text
+        assert f"run {settings.SQL_REPEATED_QUERY_THRESHOLD} times" in caplog.text
+    
+    def test_few_repeats_not_flagged(self, profiled_app, caplog):
+        """Test that statements under the threshold are not reported"""
+        with caplog.at_level(logging.WARNING, logger="app.middleware"):
+            profiled_app.get(f"/run/{settings.SQL_REPEATED_QUERY_THRESHOLD - 1}")
+        
+        assert "N+1" not in caplog.text
+    
+    def test_slow_query_logged(self, monkeypatch, caplog, database_url):
+        """Test that statements over the threshold go to the slow-query log"""
+        monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0)
+        engine = create_engine(database_url, poolclass=NullPool)
+        
+        with caplog.at_level(logging.WARNING, logger="app.database"), engine.connect() as conn:
+            conn.execute(text("SELECT 42"))
+        
+        assert "Slow query" in caplog.text
+        assert "SELECT 42" in caplog.text
@@ -0,0 +1,117 @@
+import os
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from conftest import TEST_DATABASE_URL
+
+ALEMBIC_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+# One per xdist worker, so parallel runs do not drop each other's
+MIGRATIONS_DATABASE = "_".join(filter(None, ["test_db_migrations", os.environ.get("PYTEST_XDIST_WORKER")]))
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    # The ini file is interpolated, so a literal % must be doubled
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    return config
+
+
+@pytest.fixture
+def postgres_url():
+    """A fresh, empty PostgreSQL database, dropped afterwards"""
+    if make_url(TEST_DATABASE_URL).get_backend_name() != "postgresql":
+        pytest.skip("TEST_DATABASE_URL is not a PostgreSQL database")
+    server = create_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    try:
+        with server.connect() as conn:
+            conn.execute(text(f"DROP DATABASE IF EXISTS {MIGRATIONS_DATABASE}"))
+            conn.execute(text(f"CREATE DATABASE {MIGRATIONS_DATABASE}"))
+    except OperationalError as exc:
+        pytest.skip(f"cannot create a database: {exc}")
+    url = make_url(TEST_DATABASE_URL).set(database=MIGRATIONS_DATABASE)
+    yield url.render_as_string(hide_password=False)
+    with server.connect() as conn:
+        conn.execute(text(f"DROP DATABASE IF EXISTS {MIGRATIONS_DATABASE}"))
+    server.dispose()
+
+
+class TestMigrations:
+    """Test cases for the Alembic migrations"""
+    
+    def test_sqlite_head_matches_models(self, tmp_path):
+        """Test that upgrading an empty SQLite database yields the mapped schema"""
+        url = f"sqlite:///{tmp_path / 'app.db'}"
+        config = alembic_config(url)
+        
+        command.upgrade(config, "head")
+        
+        # Raises if autogenerate finds anything left to migrate
+        command.check(config)
+        engine = create_engine(url)
+        assert "tasks_fts" in inspect(engine).get_table_names()
+        engine.dispose()
+    
+    def test_postgres_head_matches_models(self, postgres_url):
+        """Test that upgrading an empty PostgreSQL database yields the mapped schema"""
+        config = alembic_config(postgres_url)
+        
+        command.upgrade(config, "head")
+        
+        command.check(config)
+        engine = create_engine(postgres_url)
+        columns = {column["name"] for column in inspect(engine).get_columns("tasks")}
+        engine.dispose()
+        assert "search_vector" in columns
+    
+    def test_downgrade_to_base_and_back(self, postgres_url):
+        """Test that every migration can be reverted and reapplied"""
+        config = alembic_config(postgres_url)
+        
+        command.upgrade(config, "head")
+        command.downgrade(config, "base")
+        command.upgrade(config, "head")
+        
+        command.check(config)
+    
+    def test_existing_data_is_carried_forward(self, tmp_path):
+        """Test that upgrading a populated initial schema fills stats and search"""
+        url = f"sqlite:///{tmp_path / 'app.db'}"
+        config = alembic_config(url)
+        command.upgrade(config, "0001")
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO users (id, email, username, hashed_password, phone_number) "
+                "VALUES (1, 'old@example.com', 'old', 'x', 1000000000)"
+            ))
+            conn.execute(text(
+                "INSERT INTO tasks (title, description, priority, complete, user_id) VALUES "
+                "('Write report', 'quarterly numbers', 2, 1, 1), "
+                "('Plan sprint', NULL, 2, 0, 1)"
+            ))
+        
+        command.upgrade(config, "head")
+        
+        with engine.begin() as conn:
+            # Tasks written after the upgrade are counted by its triggers
+            conn.execute(text(
+                "INSERT INTO tasks (title, priority, complete, user_id) VALUES ('Retro', 2, 0, 1)"
+            ))
+            stats = conn.execute(text(
+                "SELECT user_id, priority, total, completed FROM task_stats"
+            )).all()
+            matches = conn.execute(text(
+                "SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH 'report'"
+            )).scalars().all()
+            versions = conn.execute(text("SELECT DISTINCT version FROM tasks")).scalars().all()
+        engine.dispose()
+        assert stats == [(1, 2, 3, 1)]
+        assert matches == [1]
+        assert versions == [0]
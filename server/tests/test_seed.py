@@ -0,0 +1,104 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import seed
+from app.database import Base
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    """An empty SQLite database with the app's tables"""
+    url = f"sqlite:///{tmp_path / 'seed.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return url
+
+
+def dump(url: str, query: str) -> list:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(text(query)).all()
+    engine.dispose()
+    return rows
+
+
+class TestTaskCounts:
+    """Test cases for spreading tasks over users"""
+    
+    @pytest.mark.parametrize("distribution", ["uniform", "zipf", "lognormal"])
+    def test_counts_add_up(self, distribution):
+        """Test that every distribution hands out exactly the requested tasks"""
+        counts = seed.task_counts(1000, 12345, distribution, 1.0, random.Random(0))
+        
+        assert len(counts) == 1000
+        assert sum(counts) == 12345
+    
+    def test_zipf_is_skewed(self):
+        """Test that a few users hold most tasks under zipf"""
+        counts = sorted(seed.task_counts(1000, 100000, "zipf", 1.0, random.Random(0)), reverse=True)
+        
+        assert sum(counts[:10]) > sum(counts) * 0.35
+        assert counts[0] > counts[99] * 50
+    
+    def test_chunks_cover_every_task_once(self):
+        """Test that chunks split users across boundaries without gaps"""
+        chunks = seed.plan_chunks(1, [5, 0, 12, 3], 100, chunk_size=7)
+        
+        assert [sum(n for _, _, n in runs) for _, runs in chunks] == [7, 7, 6]
+        assert [start for start, _ in chunks] == [100, 107, 114]
+        assert [run for _, runs in chunks for run in runs] == [
+            (1, 0, 5), (3, 0, 2), (3, 2, 7), (3, 9, 3), (4, 0, 3)
+        ]
+
+
+class TestLoad:
+    """Test cases for bulk-loading synthetic data"""
+    
+    def test_load_users_tasks_and_stats(self, sqlite_url):
+        """Test that users, tasks and their stats are loaded together"""
+        seed.load(sqlite_url, 50, 2000, seed=1, chunk_size=300)
+        
+        assert dump(sqlite_url, "SELECT count(*), count(DISTINCT username) FROM users") == [(50, 50)]
+        assert dump(sqlite_url, "SELECT count(*), max(id) FROM tasks") == [(2000, 2000)]
+        assert dump(sqlite_url, "SELECT sum(total) FROM task_stats") == [(2000,)]
+        assert dump(sqlite_url, "SELECT count(*) FROM tasks_fts WHERE tasks_fts MATCH 'report'")[0][0] > 0
+    
+    def test_same_seed_same_rows(self, sqlite_url, tmp_path):
+        """Test that the rows depend on the seed only, not on the chunk size"""
+        other_url = f"sqlite:///{tmp_path / 'other.db'}"
+        engine = create_engine(other_url)
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+        
+        seed.load(sqlite_url, 20, 5000, seed=7, chunk_size=64)
+        seed.load(other_url, 20, 5000, seed=7, chunk_size=5000)
+        
+        for query in [
+            "SELECT id, title, description, priority, complete, user_id FROM tasks ORDER BY id",
+            "SELECT id, email, username, first_name, is_active, phone_number FROM users ORDER BY id",
+        ]:
+            assert dump(sqlite_url, query) == dump(other_url, query)
+    
+    def test_appends_after_existing_rows(self, sqlite_url):
+        """Test that a second load continues after the ids already present"""
+        seed.load(sqlite_url, 10, 100, seed=1)
+        seed.load(sqlite_url, 10, 100, seed=2)
+        
+        assert dump(sqlite_url, "SELECT count(*), max(id) FROM users") == [(20, 20)]
+        assert dump(sqlite_url, "SELECT min(user_id), max(user_id) FROM tasks WHERE id > 100")[0][0] > 10
+    
+    def test_indexes_rebuilt_after_failed_load(self, sqlite_url, monkeypatch):
+        """Test that the indexes dropped for the load come back when it fails"""
+        def fail(*args):
+            raise RuntimeError("load failed")
+        
+        monkeypatch.setattr(seed, "load_tasks", fail)
+        before = dump(sqlite_url, "SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name")
+        
+        with pytest.raises(RuntimeError):
+            seed.load(sqlite_url, 10, 100, seed=1)
+        
+        assert dump(sqlite_url, "SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name") == before